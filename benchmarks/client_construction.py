@@ -0,0 +1,22 @@
+"""
+Measures how long it takes to construct clients and parsers.
+
+Usage: python benchmarks/client_construction.py [number]
+"""
+
+from sys import argv
+from timeit import repeat
+
+from moe_parsers.core.adapter import Client
+from moe_parsers.core.proxy import ProxySwithcher
+from moe_parsers.providers.kodik import Kodik
+
+
+def main(number: int = 10000):
+    for name, factory in (("Client()", Client), ("ProxySwithcher()", ProxySwithcher), ("Kodik()", Kodik)):
+        best = min(repeat(factory, number=number, repeat=5)) / number
+        print(f"{name:<20} {best * 1e6:8.2f} us")
+
+
+if __name__ == "__main__":
+    main(int(argv[1]) if len(argv) > 1 else 10000)
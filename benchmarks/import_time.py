@@ -0,0 +1,26 @@
+"""
+Reports the modules that dominate the import time of a module.
+
+Usage: python benchmarks/import_time.py [module] [top]
+"""
+
+import subprocess
+import sys
+
+
+def main(module: str = "moe_parsers.providers", top: int = 15):
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"], capture_output=True, text=True, check=True
+    )
+    rows = []
+    for line in result.stderr.splitlines()[1:]:
+        _, own, cumulative, name = (part.strip() for part in line.replace("import time:", "|").split("|"))
+        rows.append((int(cumulative), int(own), name))
+    rows.sort(reverse=True)
+    print(f"{'cumulative':>12} {'self':>10}  module")
+    for cumulative, own, name in rows[:top]:
+        print(f"{cumulative / 1000:10.1f}ms {own / 1000:8.1f}ms  {name}")
+
+
+if __name__ == "__main__":
+    main(*sys.argv[1:2], *(int(arg) for arg in sys.argv[2:3]))
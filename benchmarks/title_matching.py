@@ -0,0 +1,36 @@
+"""
+Compares ranking search results with difflib against the trigram title index.
+
+Usage: python benchmarks/title_matching.py [candidates]
+"""
+
+from difflib import SequenceMatcher
+from sys import argv
+from timeit import repeat
+
+from moe_parsers.core.matching import TitleIndex
+
+
+def main(candidates: int = 500):
+    items = [
+        {"title": f"Some Anime Title Number {i}", "synonyms": [f"Synonym {i}", f"Другое название {i}"]}
+        for i in range(candidates)
+    ]
+    query = "anime title 250"
+    index = TitleIndex(items)
+    cases = (
+        (
+            "SequenceMatcher",
+            lambda: sorted(items, key=lambda item: SequenceMatcher(None, query, item["title"]).ratio()),
+        ),
+        ("TitleIndex()", lambda: TitleIndex(items)),
+        ("TitleIndex.top_k", lambda: index.top_k(query, 10)),
+        ("TitleIndex.rank", lambda: index.rank(query)),
+    )
+    for name, func in cases:
+        best = min(repeat(func, number=20, repeat=5)) / 20
+        print(f"{name:<20} {best * 1e3:8.3f} ms")
+
+
+if __name__ == "__main__":
+    main(int(argv[1]) if len(argv) > 1 else 500)
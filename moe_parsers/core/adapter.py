@@ -1,123 +1,21 @@
-from aiohttp import ClientSession, TCPConnector
+from aiohttp import ClientSession, ClientTimeout, TCPConnector, ClientResponse
 from aiohttp.client import _RequestContextManager
-from asyncio import sleep, wait, FIRST_COMPLETED, create_task, run
-from json import loads
-from typing import TypedDict, Literal, Unpack, List
-from faker import Faker
-from bs4 import BeautifulSoup
-from datetime import datetime
+from asyncio import sleep, create_task, get_running_loop, shield, to_thread, AbstractEventLoop, Task
+from json import loads, dumps
+from typing import TypedDict, Literal, Unpack, List, AsyncGenerator, Callable, Dict, Tuple, TYPE_CHECKING
+from functools import cached_property, partial
 from urllib.parse import urlparse
-from random import randint
-
-
-class _ProxyParams(TypedDict, total=False):
-    protocol: Literal["http", "https", "socks4", "socks5"]
-    ip: str
-    port: str
-    username: str
-    password: str
-
-
-class Proxy:
-    def __init__(self, *args, url: str = None, **kwargs: Unpack[_ProxyParams]):
-        self.latency = None
-        self.client = None
-        self.last_used = None
-        self.use_count = 0
-        if url or len(args) == 1:
-            parsed = urlparse(url or args[0])
-            self.ip = parsed.hostname
-            self.port = parsed.port
-            self.protocol = parsed.scheme
-            self.username = parsed.username
-            self.password = parsed.password
-        elif args:
-            self.ip = args[0]
-            self.port = args[1]
-            self.protocol = args[4] if len(args) > 4 else kwargs.get("protocol", "http")
-            self.username = args[2] if len(args) > 2 else kwargs.get("username", None)
-            self.password = args[3] if len(args) > 3 else kwargs.get("password", None)
-        self.__dict__.update(**kwargs)
-
-    @property
-    def url(self):
-        return (
-            f"{self.protocol}://{self.username}:{self.password}@{self.ip}:{self.port}"
-            if self.username and self.password
-            else f"{self.protocol}://{self.ip}:{self.port}"
-        )
-
-    def __repr__(self):
-        return f"Proxy({self.url})"
-
-
-class ProxySwithcher:
-    proxies: List[Proxy]
+from time import monotonic
+from .html import parse_html
+from .cache import BaseCache, MemoryCache, validators
+from .metrics import Metrics
+from .proxy import Proxy, ProxySwithcher, _ProxyParams  # noqa: F401
+from .ratelimit import RateLimiter
+from .retry import RetryPolicy
+from .useragent import UserAgentPool, user_agents
 
-    def __init__(self, proxies: List[Proxy | str] = []):
-        self.proxies = proxies
-
-    async def check(self, proxy: Proxy | str) -> bool:
-        try:
-            start = datetime.now()
-            if isinstance(proxy, str):
-                proxy = Proxy(url=proxy)
-            if not proxy.client:
-                proxy.client = Client()
-            response = await proxy.client.request(
-                method="get",
-                url="https://httpbin.org/ip",
-                proxy=proxy.url if isinstance(proxy, Proxy) else proxy,
-                ratelimit_raise=False,
-                timeout=5,
-                use_switcher=False,
-            )
-            if response.status != 200:
-                raise Exception(f"Status code: {response.status}")
-            proxy.latency = int((datetime.now() - start).total_seconds() * 1000)
-            return proxy
-        except Exception as exc:
-            print(f"{proxy} failed the check: {exc}")
-            return False
-
-    async def checkadd(self, proxy: Proxy | str | List[Proxy | str]):
-        if isinstance(proxy, list):
-            tasks = []
-            for p in proxy:
-                task = create_task(self.checkadd(p))
-                tasks.append(task)
-                done, pending = await wait(tasks, return_when=FIRST_COMPLETED)
-                for task in done:
-                    await task
-                tasks = list(pending)
-            return
-        _ = await self.check(proxy)
-        if _:
-            self.proxies.append(proxy if isinstance(proxy, Proxy) else _)
-            return True
-        return False
-
-    def add(self, proxy: Proxy | str | List[Proxy | str]):
-        if isinstance(proxy, list):
-            for p in proxy:
-                self.add(p)
-            return
-        self.proxies.append(proxy if isinstance(proxy, Proxy) else Proxy(url=proxy))
-
-    def sort(self):
-        self.proxies.sort(key=lambda x: (x.use_count, x.latency))
-
-    def pick(self, ignore: List[Proxy | str] = []) -> Proxy:
-        self.sort()
-        for proxy in self.proxies:
-            if proxy not in ignore and proxy.url not in ignore:
-                return proxy
-        return self.proxies[0]
-
-    def get_by_url(self, url: str) -> Proxy:
-        for proxy in self.proxies:
-            if proxy.url == url:
-                return proxy
+if TYPE_CHECKING:
+    from bs4 import BeautifulSoup
 
 
 class _ClientHeaders(TypedDict, total=False):
@@ -137,10 +35,29 @@ class _ClientParams(TypedDict, total=False):
     headers: _ClientHeaders
     max_retries: int
     base_url: str
-    proxy: "ProxySwithcher" | List[Proxy | str]
+    proxy: ProxySwithcher | List[Proxy | str] | str
     debug: bool
-    cache: dict
+    cache: bool | BaseCache
     cache_lifetime: int
+    cache_max_size: int
+    ssl: bool
+    session: ClientSession
+    limit: int
+    limit_per_host: int
+    keepalive_timeout: float
+    ttl_dns_cache: int
+    rate_limits: Dict[str, List[Tuple[int, float]]] | RateLimiter
+    rate_limit_per_proxy: bool
+    host_concurrency: Dict[str, int]
+    priority_aging: float
+    retry: RetryPolicy
+    ignore_codes: List[int]
+    ratelimit_raise: bool
+    coalesce: bool
+    metrics: bool | Metrics
+    html_parser: Literal["auto", "lxml", "html5lib", "html.parser"] | str
+    user_agents: UserAgentPool
+    sticky_user_agent: bool
 
 
 class RequestArgs(TypedDict, total=False):
@@ -161,43 +78,147 @@ class RequestArgs(TypedDict, total=False):
     use_switcher: bool
     ignore_codes: List[int]
     page: int
+    cache: bool
+    refresh: bool
+    cache_lifetime: int
+    stream: bool
+    deadline: float
+    coalesce: bool
+    ignore_proxies: List[Proxy | str]
+    priority: int
 
 
 class RequestResponse:
     status: int
     headers: dict
-    text: str
-    json: dict
     data: bytes
-    soup: BeautifulSoup
+    encoding: str = "utf-8"
+    html_parser: str = "auto"
     _response: _RequestContextManager
 
     def __init__(self, **kwargs):
         self.__dict__.update(**kwargs)
+        if "data" not in self.__dict__:
+            self.data = str(self.__dict__.get("text", "")).encode(self.encoding, "replace")
+
+    @cached_property
+    def text(self) -> str:
+        return self.data.decode(self.encoding or "utf-8", "replace")
+
+    @cached_property
+    def json(self) -> dict | None:
         try:
-            self.json = loads(self.text)
+            return loads(self.data)
         except ValueError:
-            self.json = None
-        self.text = str(self.text).encode("utf-8", "replace").decode("unicode_escape")
-        self.soup = BeautifulSoup(self.text, features="html.parser")
+            return None
+
+    @cached_property
+    def soup(self) -> "BeautifulSoup":
+        return parse_html(self.text, self.html_parser)
+
+    def __repr__(self):
+        return f"<Response [{self.status}] ({len(self.data)})>"
+
+
+class StreamResponse:
+    """
+    Response returned by ``request(..., stream=True)``. The body is not buffered; the connection stays
+    checked out of the pool until the body is consumed or :meth:`close` is called, so use it as
+    ``async with await client.get(url, stream=True) as response:``.
+    """
+
+    status: int
+    headers: dict
+    encoding: str = "utf-8"
+    _response: ClientResponse
+    _metrics: Metrics | None = None
+    _host: str = None
+    _release: Callable[[], None] | None = None
+
+    def __init__(self, **kwargs):
+        self.__dict__.update(**kwargs)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        self.close()
+
+    async def iter_chunks(self, chunk_size: int = 64 * 1024) -> AsyncGenerator[bytes, None]:
+        try:
+            async for chunk in self._response.content.iter_chunked(chunk_size):
+                if self._metrics is not None:
+                    self._metrics.inc("bytes_received_total", len(chunk), host=self._host)
+                yield chunk
+        finally:
+            self.close()
+
+    async def iter_lines(self, chunk_size: int = 64 * 1024) -> AsyncGenerator[str, None]:
+        buffer = b""
+        async for chunk in self.iter_chunks(chunk_size):
+            buffer += chunk
+            *lines, buffer = buffer.split(b"\n")
+            for line in lines:
+                yield line.rstrip(b"\r").decode(self.encoding or "utf-8", "replace")
+        if buffer:
+            yield buffer.rstrip(b"\r").decode(self.encoding or "utf-8", "replace")
+
+    async def read(self) -> bytes:
+        return b"".join([chunk async for chunk in self.iter_chunks()])
+
+    async def save_to(self, path: str, chunk_size: int = 64 * 1024) -> int:
+        """
+        Writes the body to ``path`` chunk by chunk and returns the number of bytes written. File operations run
+        in a worker thread so the event loop keeps serving other requests.
+        """
+        written = 0
+        file = await to_thread(open, path, "wb")
+        try:
+            async for chunk in self.iter_chunks(chunk_size):
+                await to_thread(file.write, chunk)
+                written += len(chunk)
+        finally:
+            await to_thread(file.close)
+        return written
+
+    def close(self):
+        self._response.release()
+        if self._release is not None:
+            release, self._release = self._release, None
+            release()
 
     def __repr__(self):
-        return f"<Response [{self.status}] ({len(self.text)}, {len(self.json) if self.json else 0})>"
+        return f"<StreamResponse [{self.status}]>"
 
 
 class _Client:
+    _session: ClientSession | None = None
+    _session_loop: AbstractEventLoop | None = None
+    _proxies_loading: Task | None = None
+    _owns_switcher: bool = True
+
     def __init__(self, **params: Unpack[_ClientParams]):
         self.switcher = ProxySwithcher()
+        self._inflight = {}
+        self._pending_proxies = []
         self.__dict__.update(**params)
-        if "proxy" in params and isinstance(params["proxy"], list):
-            for proxy in params["proxy"]:
-                run(self.switcher.checkadd(proxy))
+        if isinstance(params.get("proxy"), ProxySwithcher):
+            self.switcher = self.__dict__.pop("proxy")
+            self._owns_switcher = False
+        elif isinstance(params.get("proxy"), list):
+            self._pending_proxies = self.__dict__.pop("proxy")
 
     class Exceptions:
         class BaseException(Exception):
             def __repr__(self):
                 return f"{self.__class__.__name__}({self.__dict__})"
 
+        class TooManyRetries(BaseException):
+            pass
+
+        class NoProxyAvailable(BaseException):
+            pass
+
         class RateLimit(BaseException):
             def __repr__(self):
                 return f"{self.__class__.__name__}({self.__dict__}). You can make the client automatically bypass this exception by setting ratelimit_raise=False in Client() or as a parameter in request()"
@@ -216,18 +237,141 @@ class _Client:
         }
         self._my("headers", {}).update(sorted_headers)
 
-    def soup(self, *args, **kwargs):
-        return BeautifulSoup(*args, **kwargs, features="html.parser")
+    def soup(self, markup: str | bytes, **kwargs) -> "BeautifulSoup":
+        return parse_html(markup, self._my("html_parser", "auto"), **kwargs)
+
+    async def __aenter__(self):
+        await self.get_session()
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    async def get_session(self) -> ClientSession:
+        """
+        Returns the session used for requests. Unless a session was passed to the client, a pooled
+        keep-alive session is created on first use and reused until :meth:`close` is called, so a client
+        used without ``async with`` must be closed with ``await client.close()``.
+        """
+        if self._my("session") and not self._my("session").closed:
+            return self._my("session")
+        loop = get_running_loop()
+        if self._session is None or self._session.closed or self._session_loop is not loop:
+            self._session = ClientSession(
+                connector=TCPConnector(
+                    ssl=self._my("ssl", True),
+                    limit=self._my("limit", 100),
+                    limit_per_host=self._my("limit_per_host", 10),
+                    keepalive_timeout=self._my("keepalive_timeout", 30),
+                    ttl_dns_cache=self._my("ttl_dns_cache", 300),
+                )
+            )
+            self._session_loop = loop
+        return self._session
+
+    async def load_proxies(self):
+        """
+        Checks the proxies passed to the client as a list and adds the working ones to the switcher.
+        Called automatically before the first request.
+        """
+        if self._pending_proxies:
+            pending, self._pending_proxies = self._pending_proxies, []
+            self._proxies_loading = create_task(self.switcher.import_proxies(pending))
+        if self._proxies_loading is not None:
+            await shield(self._proxies_loading)
+
+    async def close(self):
+        if self._owns_switcher:
+            await self.switcher.close()
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+        self._session_loop = None
 
     async def close_session(self):
         if self._my("session"):
             await self._my("session").close()
+        await self.close()
+
+    def get_cache(self) -> BaseCache | None:
+        """
+        Returns the response cache of the client or None if caching is disabled. Passing ``cache=True`` to the
+        client creates a :class:`MemoryCache` bounded by ``cache_lifetime`` and ``cache_max_size``, any other
+        :class:`BaseCache` (e.g. :class:`moe_parsers.core.cache.SQLiteCache`) can be passed as well.
+        """
+        cache = self._my("cache")
+        if cache is True:
+            cache = self.cache = MemoryCache(
+                lifetime=self._my("cache_lifetime", 300), max_size=self._my("cache_max_size", 64 * 1024 * 1024)
+            )
+        return cache or None
+
+    def get_retry_policy(self) -> RetryPolicy:
+        """
+        Returns the retry policy of the client, by default built from ``max_retries`` on first use.
+        """
+        if not isinstance(self._my("retry"), RetryPolicy):
+            self.retry = RetryPolicy(max_retries=self._my("max_retries", 5))
+        return self.retry
+
+    def get_metrics(self) -> Metrics | None:
+        """
+        Returns the metrics of the client, or None if they were disabled with ``metrics=False``.
+        """
+        metrics = self._my("metrics", True)
+        if metrics is True:
+            metrics = self.metrics = Metrics()
+        return metrics or None
+
+    def on(self, event: Literal["before_request", "after_response", "on_retry"], callback):
+        """
+        Registers a request hook, see :class:`Metrics`. Hooks are run by the metrics of the client, so they
+        can't be registered on a client created with ``metrics=False``.
+        """
+        metrics = self.get_metrics()
+        if metrics is None:
+            raise ValueError("Request hooks need metrics, create the client without metrics=False")
+        return metrics.on(event, callback)
+
+    def stats(self) -> dict:
+        """
+        Snapshot of request metrics, cache, proxy pool and rate limiter stats
+        """
+        metrics, cache = self.get_metrics(), self.get_cache()
+        return {
+            "requests": metrics.snapshot() if metrics is not None else None,
+            "cache": cache.stats() if cache is not None else None,
+            "proxies": self.switcher.stats(),
+            "rate_limits": self.get_rate_limiter().stats(),
+        }
 
-    async def request(self, *args, **kwargs: Unpack[RequestArgs]) -> RequestResponse:
+    def prometheus(self, prefix: str = "moe_parsers") -> str:
+        """
+        Exports :meth:`stats` in the Prometheus text format
+        """
+        stats = self.stats()
+        gauges = {"proxies": stats["proxies"], "cache": stats["cache"] or {}}
+        for key, lane in stats["rate_limits"].items():
+            gauges.setdefault("rate_limit_waiting", {})[key] = lane["waiting"]
+        return (self.get_metrics() or Metrics()).prometheus(prefix, gauges)
+
+    def get_rate_limiter(self) -> RateLimiter:
+        """
+        Returns the rate limiter shared by all requests of the client, created from ``rate_limits``,
+        ``host_concurrency`` and ``priority_aging`` on first use. It also orders waiting requests by their
+        ``priority``, so keep ``host_concurrency`` below ``limit_per_host`` for priorities to decide who gets
+        a connection.
+        """
+        limiter = self._my("rate_limits")
+        if not isinstance(limiter, RateLimiter):
+            limiter = self.rate_limits = RateLimiter(
+                limiter, concurrency=self._my("host_concurrency"), aging=self._my("priority_aging", 1.0)
+            )
+        return limiter
+
+    async def request(self, *args, **kwargs: Unpack[RequestArgs]) -> RequestResponse | StreamResponse:
         if self._my("debug", False):
             print(kwargs.items())
-        if kwargs.get("retries", 0) > self._my("max_retries", 5):
-            raise Exception("Too many retries")
         if not kwargs.get("url", None) and args and isinstance(args[0], str):
             kwargs["url"] = args[0]
         elif not kwargs.get("url", None):
@@ -235,74 +379,250 @@ class _Client:
         kwargs["url"] = kwargs["url"].replace(" ", "%20")
         if not kwargs["url"].startswith("http"):
             kwargs["url"] = f"{self._my('base_url') or 'https://'}{kwargs['url']}"
-        session: ClientSession = self._my("session") or ClientSession(
-            headers=kwargs.get("headers", None),
-            connector=TCPConnector(ssl=self._my("ssl", True), verify_ssl=self._my("ssl", True)),
-        )
-        if self._my("proxy") or kwargs.get("proxy", None):
-            session._ssl = False
-        if not kwargs.get("use_switcher", True) or len(self.switcher.proxies) == 0 or "proxy" in kwargs:
-            proxy = kwargs.get("proxy", None) or self._my("proxy", None)
-        else:
-            proxy = self.switcher.pick(ignore=kwargs.get("ignore_proxies", []))
-            proxy.last_used = datetime.now()
-            proxy.use_count += 1
-            proxy = proxy.url
-        if proxy and self._my("debug", False):
-            print(f"Using proxy: {proxy}")
-        async with session.request(
-            method=kwargs.get("method", "get"),
-            url=kwargs.get("url"),
-            data=kwargs.get("data", None),
-            json=kwargs.get("json", None),
-            headers=kwargs.get("headers", None) or self._my("headers"),
-            params={**kwargs.get("params", {}), "page": kwargs.get("page", 1)}
+        method = kwargs.get("method", "get").lower()
+        params = (
+            {**kwargs.get("params", {}), "page": kwargs.get("page", 1)}
             if kwargs.get("page", None)
-            else kwargs.get("params", None),
-            proxy=proxy,
-            timeout=kwargs.get("timeout", None),
-        ) as response:
-            response = RequestResponse(
-                text=await response.text(),
-                status=response.status,
-                headers=response.headers,
-                _response=response,
-            )
-        if self._my("debug", False):
-            print(response, response.text, sep="\n")
-        if self.switcher.get_by_url(proxy):
-            self.switcher.get_by_url(proxy).latency = int(
-                (datetime.now() - self.switcher.get_by_url(proxy).last_used).total_seconds() * 1000
-            )
-        if kwargs.get("close", True):
-            await session.close()
+            else kwargs.get("params", None)
+        )
+        cache, cache_key, stale = self.get_cache(), None, None
         if (
-            len(str(response.status)) == 3
-            and str(response.status).startswith("5")
-            and (response.status not in kwargs.get("ingore_codes", self._my("ingore_codes", [])))
+            cache is not None
+            and kwargs.get("cache", True)
+            and not kwargs.get("stream", False)
+            and method in ("get", "post")
         ):
-            await sleep(float("0." + "".join(str(randint(1, 9)) for x in range(3))))
-            kwargs.update({"retries": kwargs.get("retries", 0) + 1})
-            if kwargs.get("use_switcher", True) and len(self.switcher.proxies) > 1:
-                ignored = kwargs.get("ignore_proxies", [])
-                ignored.append(self.switcher.get_by_url(proxy))
-                kwargs.update({"ignore_proxies": ignored})
-            return await self.request(*args, **kwargs)
-        if response.status == 429:
-            if kwargs.get("ratelimit_raise", self._my("ratelimit_raise", True)):
-                raise self.Exceptions.RateLimit
-            retry_after = response.headers.get("Retry-After", 1)
-            await sleep(float(retry_after))
-            kwargs.update({"retries": kwargs.get("retries", 0) + 1})
-            if kwargs.get("use_switcher", True) and len(self.switcher.proxies) > 1:
-                ignored = kwargs.get("ignore_proxies", [])
-                ignored.append(self.switcher.get_by_url(proxy))
-                kwargs.update({"ignore_proxies": ignored})
-            return await self.request(*args, **kwargs)
+            cache_key = cache.key(method, kwargs["url"], params, kwargs.get("json", None), kwargs.get("data", None))
+            if not kwargs.get("refresh", False):
+                cached = await cache.get(cache_key)
+                if self.get_metrics() is not None:
+                    self.get_metrics().inc(
+                        "cache_requests_total",
+                        host=urlparse(kwargs["url"]).hostname,
+                        result="miss" if cached is None else "hit",
+                    )
+                if cached is not None:
+                    cached.html_parser = self._my("html_parser", "auto")
+                    return cached
+            stale = await cache.get_stale(cache_key)
+            if stale is not None:
+                stale.html_parser = self._my("html_parser", "auto")
+        # only reads are merged: GET requests and POST requests with a JSON body (GraphQL queries)
+        coalescable = method.lower() == "get" or (method.lower() == "post" and kwargs.get("json") is not None)
+        if coalescable and kwargs.get("coalesce", self._my("coalesce", False)) and not kwargs.get("stream", False):
+            key = cache_key or MemoryCache.key(
+                method, kwargs["url"], params, kwargs.get("json", None), kwargs.get("data", None)
+            )
+            task = self._inflight.get(key)
+            if task is None:
+                task = self._inflight[key] = create_task(self._fetch(method, params, cache_key, kwargs, stale))
+                task.add_done_callback(partial(self._settle, key))
+            return await shield(task)
+        return await self._fetch(method, params, cache_key, kwargs, stale)
+
+    def _settle(self, key: str, task: Task):
+        self._inflight.pop(key, None)
+        if not task.cancelled():
+            task.exception()
+
+    async def _fetch(
+        self,
+        method: str,
+        params: dict | None,
+        cache_key: str | None,
+        kwargs: RequestArgs,
+        stale: RequestResponse | None = None,
+    ) -> RequestResponse | StreamResponse:
+        session: ClientSession = kwargs.get("session", None) or await self.get_session()
+        if kwargs.get("use_switcher", True):
+            await self.load_proxies()
+        policy = self.get_retry_policy()
+        if policy.budget is not None:
+            policy.budget.record_request()
+        deadline = monotonic() + kwargs["deadline"] if kwargs.get("deadline", None) else None
+        ignore_codes = kwargs.get("ignore_codes", self._my("ignore_codes", []))
+        ignore_proxies = list(kwargs.get("ignore_proxies", []))
+        attempt = kwargs.get("retries", 0)
+        metrics, host = self.get_metrics(), urlparse(kwargs["url"]).hostname
+        headers = kwargs.get("headers", None) or self._my("headers")
+        if stale is not None:
+            headers = {**(headers or {}), **validators(stale)}
+        request_headers = headers
+        while True:
+            if not kwargs.get("use_switcher", True) or len(self.switcher) == 0 or "proxy" in kwargs:
+                proxy = kwargs.get("proxy", None) or self._my("proxy", None)
+                picked = self.switcher.get_by_url(proxy) if isinstance(proxy, str) else None
+            else:
+                picked = self.switcher.pick(ignore=ignore_proxies)
+                if picked is None:
+                    raise self.Exceptions.NoProxyAvailable("Every proxy of the pool has an open circuit breaker")
+                self.switcher.use(picked)
+                proxy = picked.url
+            if proxy and self._my("debug", False):
+                print(f"Using proxy: {proxy}")
+            if proxy and self._my("sticky_user_agent", False):
+                request_headers = {
+                    **(headers or {}),
+                    "User-Agent": self._my("user_agents", user_agents).sticky(getattr(proxy, "url", proxy)),
+                }
+            limiter, lane = self.get_rate_limiter(), proxy if self._my("rate_limit_per_proxy", False) else None
+            waited = await limiter.acquire(host, lane, kwargs.get("priority", 0))
+            release = partial(limiter.release, host, lane)
+            if metrics is not None:
+                try:
+                    if waited:
+                        metrics.observe("rate_limit_wait_seconds", waited, host=host)
+                    await metrics.emit("before_request", method=method, url=kwargs["url"], proxy=proxy, attempt=attempt)
+                except BaseException:
+                    release()
+                    raise
+            timeout = kwargs.get("timeout", None)
+            start = monotonic()
+            if deadline is not None:
+                remaining = max(deadline - monotonic(), 0.001)
+                timeout = min(timeout, remaining) if isinstance(timeout, (int, float)) else remaining
+            try:
+                response = await session.request(
+                    method=method,
+                    url=kwargs.get("url"),
+                    data=kwargs.get("data", None),
+                    json=kwargs.get("json", None),
+                    headers=request_headers,
+                    params=params,
+                    proxy=proxy,
+                    ssl=False if proxy else self._my("ssl", True),
+                    timeout=ClientTimeout(total=timeout) if isinstance(timeout, (int, float)) else timeout,
+                )
+                if kwargs.get("stream", False):
+                    response = StreamResponse(
+                        encoding=response.charset or "utf-8",
+                        status=response.status,
+                        headers=response.headers,
+                        _response=response,
+                        _metrics=metrics,
+                        _host=host,
+                        _release=release,
+                    )
+                    release = None
+                else:
+                    async with response:
+                        response = RequestResponse(
+                            data=await response.read(),
+                            encoding=response.charset or "utf-8",
+                            status=response.status,
+                            headers=response.headers,
+                            html_parser=self._my("html_parser", "auto"),
+                            _response=response,
+                        )
+            except Exception as exc:
+                if picked is not None:
+                    self.switcher.report(picked, ok=False)
+                if metrics is not None:
+                    metrics.inc("errors_total", host=host, error=type(exc).__name__)
+                if not policy.retries_exception(exc):
+                    raise
+                delay = policy.delay(attempt, exc, deadline=deadline, max_retries=kwargs.get("max_retries", None))
+                if delay is None:
+                    raise
+                reason = type(exc).__name__
+            else:
+                elapsed = monotonic() - start
+                if self._my("debug", False):
+                    print(response)
+                if picked is not None:
+                    self.switcher.report(picked, latency=int(elapsed * 1000), ok=response.status < 500)
+                if metrics is not None:
+                    try:
+                        await self._record(metrics, method, host, proxy, attempt, response, elapsed, kwargs)
+                    except BaseException:
+                        # the stream owns the concurrency slot and the connection once it is created
+                        if isinstance(response, StreamResponse):
+                            response.close()
+                        raise
+                if response.status in ignore_codes or not policy.retries_status(response.status):
+                    break
+                if isinstance(response, StreamResponse):
+                    response.close()
+                if response.status == 429 and kwargs.get("ratelimit_raise", self._my("ratelimit_raise", True)):
+                    raise self.Exceptions.RateLimit
+                delay = policy.delay(
+                    attempt,
+                    response.status,
+                    retry_after=response.headers.get("Retry-After", None),
+                    deadline=deadline,
+                    max_retries=kwargs.get("max_retries", None),
+                )
+                if delay is None:
+                    raise self.Exceptions.TooManyRetries(f"Too many retries ({response.status} {kwargs['url']})")
+                reason = response.status
+            finally:
+                if release is not None:
+                    release()
+            if self._my("debug", False):
+                print(f"Retrying after {reason} in {delay:.3f}s")
+            if metrics is not None:
+                metrics.inc("retries_total", host=host, reason=reason)
+                await metrics.emit(
+                    "on_retry",
+                    method=method,
+                    url=kwargs["url"],
+                    proxy=proxy,
+                    attempt=attempt,
+                    delay=delay,
+                    reason=reason,
+                )
+            attempt += 1
+            if kwargs.get("use_switcher", True) and len(self.switcher) > 1 and proxy:
+                ignore_proxies.append(proxy)
+            await sleep(delay)
+        if stale is not None and response.status == 304:
+            if metrics is not None:
+                metrics.inc("cache_revalidated_total", host=host)
+            await self.get_cache().set(cache_key, stale, kwargs.get("cache_lifetime", None))
+            return stale
         if "set-cookie" in response.headers.keys() and not kwargs.get("ignore_set_cookie", False):
             self.replace_headers(cookie=response.headers.get("set-cookie"))
+        if cache_key is not None and 200 <= response.status < 300:
+            await self.get_cache().set(cache_key, response, kwargs.get("cache_lifetime", None))
         return response
 
+    async def _record(
+        self,
+        metrics: Metrics,
+        method: str,
+        host: str,
+        proxy: str | None,
+        attempt: int,
+        response: RequestResponse | StreamResponse,
+        elapsed: float,
+        kwargs: RequestArgs,
+    ):
+        metrics.inc("requests_total", host=host, method=method, status=response.status)
+        metrics.observe("request_duration_seconds", elapsed, host=host)
+        if proxy:
+            label = urlparse(proxy).netloc.rsplit("@", 1)[-1]
+            metrics.inc("proxy_requests_total", proxy=label, status=response.status)
+            metrics.observe("proxy_request_duration_seconds", elapsed, proxy=label)
+        if response.status == 429:
+            metrics.inc("rate_limited_total", host=host)
+        if isinstance(response, RequestResponse):
+            metrics.inc("bytes_received_total", len(response.data), host=host)
+        body = kwargs.get("data", None)
+        if kwargs.get("json", None) is not None:
+            body = dumps(kwargs["json"])
+        if isinstance(body, (str, bytes)):
+            metrics.inc("bytes_sent_total", len(body), host=host)
+        await metrics.emit(
+            "after_response",
+            method=method,
+            url=kwargs["url"],
+            proxy=proxy,
+            attempt=attempt,
+            status=response.status,
+            elapsed=elapsed,
+            response=response,
+        )
+
     async def get(self, *args, **kwargs: Unpack[RequestArgs]) -> RequestResponse:
         return await self.request(method="get", *args, **kwargs)
 
@@ -318,7 +638,7 @@ class _Client:
 
 class Client(_Client):
     def __init__(self, **params: Unpack[_ClientParams]):
-        super().__init__(**params)
         self.max_retries = 6
-        self.headers = {"User-Agent": Faker().user_agent()}
-        self.__dict__.update(**params)
+        super().__init__(**params)
+        if "headers" not in params:
+            self.headers = {"User-Agent": self._my("user_agents", user_agents).next()}
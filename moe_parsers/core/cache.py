@@ -0,0 +1,355 @@
+from asyncio import to_thread
+from collections import OrderedDict
+from hashlib import sha1
+from json import dumps, loads
+from multidict import CIMultiDict, CIMultiDictProxy
+from sqlite3 import connect, Connection
+from threading import Lock
+from time import monotonic, time
+from typing import TYPE_CHECKING
+from zlib import compress, decompress
+
+if TYPE_CHECKING:
+    from .adapter import RequestResponse
+
+
+def validators(response: "RequestResponse") -> dict:
+    """
+    Conditional request headers that revalidate ``response``, empty if it has no ETag or Last-Modified header
+    """
+    headers = {}
+    if response.headers.get("ETag"):
+        headers["If-None-Match"] = response.headers["ETag"]
+    if response.headers.get("Last-Modified"):
+        headers["If-Modified-Since"] = response.headers["Last-Modified"]
+    return headers
+
+
+# approximate memory of the values derived from a body, relative to its size; a parsed tree is the largest
+_DERIVED_FACTORS = {"text": 1, "json": 4, "soup": 10}
+
+
+def response_size(response: "RequestResponse") -> int:
+    """
+    Estimated memory held by a response: its body plus the text, json and soup already built from it
+    """
+    size = len(response.data)
+    return size + sum(size * factor for name, factor in _DERIVED_FACTORS.items() if name in response.__dict__)
+
+
+class CacheEntry:
+    __slots__ = ("response", "expires", "size")
+
+    def __init__(self, response: "RequestResponse", expires: float, size: int):
+        self.response = response
+        self.expires = expires
+        self.size = size
+
+    @property
+    def expired(self) -> bool:
+        return monotonic() >= self.expires
+
+
+class BaseCache:
+    """
+    Interface of response caches used by :class:`moe_parsers.core.adapter.Client`
+    """
+
+    hits: int = 0
+    misses: int = 0
+
+    @staticmethod
+    def key(method: str, url: str, params: dict = None, json: dict = None, data: dict = None) -> str:
+        """
+        Builds a cache key from everything that identifies a request, including the JSON body so POST requests
+        (e.g. GraphQL queries) can be cached as well.
+        """
+        return sha1(
+            dumps([method.upper(), url, params, json, data], sort_keys=True, default=str).encode("utf-8")
+        ).hexdigest()
+
+    async def get(self, key: str) -> "RequestResponse | None":
+        raise NotImplementedError
+
+    async def get_stale(self, key: str) -> "RequestResponse | None":
+        return None
+
+    async def set(self, key: str, response: "RequestResponse", lifetime: int = None):
+        raise NotImplementedError
+
+    async def delete(self, key: str):
+        raise NotImplementedError
+
+    async def clear(self):
+        raise NotImplementedError
+
+    def stats(self) -> dict:
+        return {"hits": self.hits, "misses": self.misses}
+
+
+class MemoryCache(BaseCache):
+    """
+    In-memory LRU cache of responses, bounded by their estimated memory in bytes (see :func:`response_size`).
+    Cached responses keep the text, json and soup built from them so they are not parsed again, so an entry
+    is measured again each time it is read. Expired responses that carry an ETag or Last-Modified header are
+    kept so they can be revalidated.
+
+    Args:
+        lifetime: Default time to live of an entry in seconds
+        max_size: Maximum estimated memory of the cached responses in bytes, least recently used entries are
+            evicted first
+    """
+
+    def __init__(self, lifetime: int = 300, max_size: int = 64 * 1024 * 1024):
+        self.lifetime = lifetime
+        self.max_size = max_size
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[str, CacheEntry] = OrderedDict()
+
+    async def get(self, key: str) -> "RequestResponse | None":
+        entry = self._entries.get(key)
+        if entry is None or entry.expired:
+            if entry is not None and not validators(entry.response):
+                self._pop(key)
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        # the text, json or soup may have been built since the entry was measured
+        size = response_size(entry.response)
+        self.size += size - entry.size
+        entry.size = size
+        self._evict()
+        return entry.response
+
+    async def get_stale(self, key: str) -> "RequestResponse | None":
+        """
+        Returns the cached response even if it expired, provided it can be revalidated
+        """
+        entry = self._entries.get(key)
+        if entry is None or not validators(entry.response):
+            return None
+        return entry.response
+
+    async def set(self, key: str, response: "RequestResponse", lifetime: int = None):
+        size = response_size(response)
+        if size > self.max_size:
+            return
+        self._pop(key)
+        self._entries[key] = CacheEntry(response, monotonic() + (lifetime or self.lifetime), size)
+        self.size += size
+        self._evict()
+
+    def _evict(self):
+        while self.size > self.max_size:
+            self._pop(next(iter(self._entries)))
+
+    async def delete(self, key: str):
+        self._pop(key)
+
+    async def clear(self):
+        self._entries.clear()
+        self.size = 0
+
+    def _pop(self, key: str):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.size -= entry.size
+
+    def stats(self) -> dict:
+        return {
+            "entries": len(self._entries),
+            "size": self.size,
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+
+class SQLiteCache(BaseCache):
+    """
+    Response cache stored in an SQLite database, so it survives restarts and can be shared by several
+    processes (the database runs in WAL mode). Bodies are zlib-compressed and the least recently used
+    responses are evicted once the stored size exceeds ``max_size``.
+
+    Args:
+        path: Path of the database file
+        lifetime: Default time to live of an entry in seconds
+        max_size: Maximum total size of stored (compressed) bodies in bytes
+        compress_min_size: Bodies smaller than this are stored uncompressed
+    """
+
+    def __init__(
+        self,
+        path: str = "moe_parsers_cache.db",
+        lifetime: int = 3600,
+        max_size: int = 512 * 1024 * 1024,
+        compress_min_size: int = 1024,
+    ):
+        self.path = str(path)
+        self.lifetime = lifetime
+        self.max_size = max_size
+        self.compress_min_size = compress_min_size
+        self.hits = 0
+        self.misses = 0
+        self._connection: Connection | None = None
+        self._lock = Lock()
+        self._totals = (0, 0)
+
+    def _connect(self) -> Connection:
+        if self._connection is None:
+            connection = connect(self.path, timeout=30, check_same_thread=False, isolation_level=None)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            connection.executescript(
+                """
+                CREATE TABLE IF NOT EXISTS responses (
+                    key TEXT PRIMARY KEY,
+                    status INTEGER NOT NULL,
+                    headers TEXT NOT NULL,
+                    encoding TEXT,
+                    body BLOB NOT NULL,
+                    compressed INTEGER NOT NULL,
+                    size INTEGER NOT NULL,
+                    expires REAL NOT NULL,
+                    revalidatable INTEGER NOT NULL,
+                    accessed REAL NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed);
+                CREATE TABLE IF NOT EXISTS meta (id INTEGER PRIMARY KEY CHECK (id = 0), size INTEGER NOT NULL);
+                INSERT OR IGNORE INTO meta VALUES (0, 0);
+                CREATE TRIGGER IF NOT EXISTS responses_insert AFTER INSERT ON responses
+                    BEGIN UPDATE meta SET size = size + NEW.size; END;
+                CREATE TRIGGER IF NOT EXISTS responses_update AFTER UPDATE OF size ON responses
+                    BEGIN UPDATE meta SET size = size - OLD.size + NEW.size; END;
+                CREATE TRIGGER IF NOT EXISTS responses_delete AFTER DELETE ON responses
+                    BEGIN UPDATE meta SET size = size - OLD.size; END;
+                """
+            )
+            self._connection = connection
+            self._count()
+        return self._connection
+
+    def _execute(self, query: str, parameters: tuple = ()) -> list:
+        with self._lock:
+            return self._connect().execute(query, parameters).fetchall()
+
+    def _count(self):
+        # runs in the worker threads after writes, so stats() never queries the database on the event loop
+        ((entries, size),) = self._connection.execute(
+            "SELECT COUNT(*), (SELECT size FROM meta) FROM responses"
+        ).fetchall()
+        self._totals = (entries, size)
+
+    def _write(self, query: str, parameters: tuple = ()):
+        with self._lock:
+            self._connect().execute(query, parameters)
+            self._count()
+
+    def _get(self, key: str, stale: bool) -> "RequestResponse | None":
+        from .adapter import RequestResponse
+
+        rows = self._execute(
+            "SELECT status, headers, encoding, body, compressed, expires, revalidatable FROM responses WHERE key = ?",
+            (key,),
+        )
+        if not rows:
+            return None
+        status, headers, encoding, body, compressed, expires, revalidatable = rows[0]
+        if expires <= time() and not stale:
+            if not revalidatable:
+                self._write("DELETE FROM responses WHERE key = ?", (key,))
+            return None
+        if stale and not revalidatable:
+            return None
+        self._execute("UPDATE responses SET accessed = ? WHERE key = ?", (time(), key))
+        return RequestResponse(
+            data=decompress(body) if compressed else body,
+            status=status,
+            headers=CIMultiDictProxy(CIMultiDict(loads(headers))),
+            encoding=encoding,
+        )
+
+    def _set(self, key: str, response: "RequestResponse", lifetime: int):
+        body, compressed = response.data, len(response.data) >= self.compress_min_size
+        if compressed:
+            body = compress(body)
+        if len(body) > self.max_size:
+            return
+        now = time()
+        self._write(
+            """
+            INSERT INTO responses (
+                key, status, headers, encoding, body, compressed, size, expires, revalidatable, accessed
+            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT (key) DO UPDATE SET
+                status = excluded.status, headers = excluded.headers, encoding = excluded.encoding,
+                body = excluded.body, compressed = excluded.compressed, size = excluded.size,
+                expires = excluded.expires, revalidatable = excluded.revalidatable, accessed = excluded.accessed
+            """,
+            (
+                key,
+                response.status,
+                dumps(list(response.headers.items())),
+                response.encoding,
+                body,
+                int(compressed),
+                len(body),
+                now + (lifetime or self.lifetime),
+                int(bool(validators(response))),
+                now,
+            ),
+        )
+        if self._execute("SELECT size FROM meta")[0][0] > self.max_size:
+            # keeps the most recently used responses that fit into max_size
+            self._write(
+                """
+                DELETE FROM responses WHERE key IN (
+                    SELECT key FROM (
+                        SELECT key, SUM(size) OVER (ORDER BY accessed DESC, key) AS total FROM responses
+                    ) WHERE total > ?
+                )
+                """,
+                (self.max_size,),
+            )
+
+    async def get(self, key: str) -> "RequestResponse | None":
+        response = await to_thread(self._get, key, False)
+        if response is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return response
+
+    async def get_stale(self, key: str) -> "RequestResponse | None":
+        return await to_thread(self._get, key, True)
+
+    async def set(self, key: str, response: "RequestResponse", lifetime: int = None):
+        await to_thread(self._set, key, response, lifetime)
+
+    async def delete(self, key: str):
+        await to_thread(self._write, "DELETE FROM responses WHERE key = ?", (key,))
+
+    async def clear(self):
+        await to_thread(self._write, "DELETE FROM responses")
+
+    async def purge(self):
+        """
+        Deletes expired responses that cannot be revalidated
+        """
+        await to_thread(self._write, "DELETE FROM responses WHERE expires <= ? AND NOT revalidatable", (time(),))
+
+    def close(self):
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
+
+    def stats(self) -> dict:
+        """
+        Cache stats, ``entries`` and ``size`` are counted when the database is opened and after each write of
+        this process, so writes made by other processes show up after the next one
+        """
+        entries, size = self._totals
+        return {"entries": entries, "size": size, "max_size": self.max_size, "hits": self.hits, "misses": self.misses}
@@ -0,0 +1,98 @@
+from importlib.util import find_spec
+from typing import Any, Callable, Dict, Tuple, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from bs4 import BeautifulSoup, SoupStrainer
+    from bs4.filter import ElementFilter
+
+
+def _bs4_backend(features: str) -> Callable[..., "BeautifulSoup"]:
+    def parse(markup: str | bytes, parse_only: "SoupStrainer | ElementFilter" = None, **kwargs) -> "BeautifulSoup":
+        from bs4 import BeautifulSoup
+
+        return BeautifulSoup(markup, features=features, parse_only=parse_only, **kwargs)
+
+    return parse
+
+
+BACKENDS: Dict[str, Callable[..., Any]] = {
+    "lxml": _bs4_backend("lxml"),
+    "html5lib": _bs4_backend("html5lib"),
+    "html.parser": _bs4_backend("html.parser"),
+}
+_REQUIREMENTS = {"lxml": "lxml", "html5lib": "html5lib"}
+_AVAILABLE: Dict[str, bool] = {}
+
+
+def register_backend(name: str, parse: Callable[..., Any], requires: str = None):
+    """
+    Registers an HTML parser backend.
+
+    Args:
+        name: Name used in ``Client(html_parser=name)``
+        parse: Callable taking the markup (and ``parse_only``) and returning a tree with the BeautifulSoup API
+        requires: Module that must be importable for the backend to be available
+    """
+    BACKENDS[name] = parse
+    if requires:
+        _REQUIREMENTS[name] = requires
+    _AVAILABLE.pop(name, None)
+
+
+def available(name: str) -> bool:
+    """
+    Whether the backend is registered and its requirement is installed, the lookup is done once per backend
+    """
+    if name not in _AVAILABLE:
+        _AVAILABLE[name] = name in BACKENDS and (
+            name not in _REQUIREMENTS or find_spec(_REQUIREMENTS[name]) is not None
+        )
+    return _AVAILABLE[name]
+
+
+def resolve(name: str = "auto") -> str:
+    """
+    Returns the backend used for ``name``, ``"auto"`` picks lxml when it is installed and html.parser otherwise
+    """
+    if name == "auto":
+        return "lxml" if available("lxml") else "html.parser"
+    if not available(name):
+        raise ValueError(f"HTML parser backend {name!r} is not available")
+    return name
+
+
+def _matches(attrs: Dict[str, str], conditions: Dict[str, str]) -> bool:
+    for key, value in conditions.items():
+        actual = attrs.get(key)
+        if isinstance(actual, str) and key == "class":
+            actual = actual.split()
+        if actual is None or (value not in actual if isinstance(actual, list) else actual != value):
+            return False
+    return True
+
+
+def region_filter(*regions: Tuple[str, Dict[str, str]]) -> "ElementFilter":
+    """
+    Builds a ``parse_only`` filter keeping only the elements matching one of ``regions`` with everything inside
+    them, the rest of the document is never turned into a tree.
+
+    Args:
+        regions: ``(tag name, attributes)`` pairs, the ``class`` attribute matches any of the element's classes
+    """
+    from bs4.filter import ElementFilter
+
+    class RegionFilter(ElementFilter):
+        def allow_tag_creation(self, nsprefix: str | None, name: str, attrs: Dict[str, str] | None) -> bool:
+            return any(name == tag and _matches(attrs or {}, conditions) for tag, conditions in regions)
+
+        def allow_string_creation(self, string: str) -> bool:
+            return False
+
+    return RegionFilter()
+
+
+def parse_html(markup: str | bytes, backend: str = "auto", parse_only: "SoupStrainer | ElementFilter" = None, **kwargs):
+    """
+    Parses ``markup`` with the given backend
+    """
+    return BACKENDS[resolve(backend)](markup, parse_only=parse_only, **kwargs)
@@ -1,4 +1,4 @@
-from typing import List, Literal, Dict
+from typing import Any, Callable, List, Literal, Dict
 from .adapter import _Client
 from .parser import _Parser
 from enum import Enum
@@ -38,6 +38,114 @@ class ItemDatetime(datetime):
         return super().__str__().split(" ")[0]
 
 
+class LazyDict(dict):
+    """
+    Dictionary whose deferred values are computed on first access and cached.
+
+    Notes
+    -----
+    Reading a deferred key with ``[]`` or :meth:`get` computes only that value. Iterating, comparing,
+    printing, copying or pickling the dictionary materializes every deferred value first, so the
+    callables registered with :meth:`defer` never have to be picklable.
+    """
+
+    __slots__ = ("_deferred",)
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._deferred: Dict[Any, Callable[[], Any]] = {}
+
+    def defer(self, key, factory: Callable[[], Any]) -> "LazyDict":
+        """
+        Registers ``factory`` to compute the value of ``key`` when it is first read.
+
+        Parameters
+        ----------
+        key : hashable
+            The key of the deferred value.
+        factory : callable
+            Called without arguments to compute the value.
+        """
+        super().pop(key, None)
+        self._deferred[key] = factory
+        return self
+
+    def materialize(self) -> "LazyDict":
+        """
+        Computes every deferred value.
+        """
+        for key in list(self._deferred):
+            self[key]
+        return self
+
+    def __missing__(self, key):
+        if key not in self._deferred:
+            raise KeyError(key)
+        value = self._deferred.pop(key)()
+        super().__setitem__(key, value)
+        return value
+
+    def __contains__(self, key):
+        return key in self._deferred or super().__contains__(key)
+
+    def get(self, key, default=None):
+        return self[key] if key in self else default
+
+    def __setitem__(self, key, value):
+        self._deferred.pop(key, None)
+        super().__setitem__(key, value)
+
+    def __delitem__(self, key):
+        if self._deferred.pop(key, None) is None:
+            super().__delitem__(key)
+
+    def pop(self, key, *default):
+        if key in self:
+            self[key]
+        return super().pop(key, *default)
+
+    def setdefault(self, key, default=None):
+        if key not in self:
+            self[key] = default
+        return self[key]
+
+    def update(self, *args, **kwargs):
+        for key, value in dict(*args, **kwargs).items():
+            self[key] = value
+
+    def __iter__(self):
+        return super(LazyDict, self.materialize()).__iter__()
+
+    def __len__(self):
+        return super().__len__() + len(self._deferred)
+
+    def keys(self):
+        return super(LazyDict, self.materialize()).keys()
+
+    def values(self):
+        return super(LazyDict, self.materialize()).values()
+
+    def items(self):
+        return super(LazyDict, self.materialize()).items()
+
+    def copy(self) -> "LazyDict":
+        return LazyDict(self.items())
+
+    def __eq__(self, other):
+        return super(LazyDict, self.materialize()).__eq__(other)
+
+    def __ne__(self, other):
+        return not self == other
+
+    __hash__ = None
+
+    def __repr__(self):
+        return super(LazyDict, self.materialize()).__repr__()
+
+    def __reduce__(self):
+        return LazyDict, (dict(self.items()),)
+
+
 class _BaseItem:
     class ItemType(XEnum):
         ANIME = "anime"
@@ -0,0 +1,132 @@
+from collections import Counter, defaultdict
+from functools import lru_cache
+from heapq import nlargest
+from itertools import chain
+from math import sqrt
+from re import compile
+from typing import Any, Dict, Generic, Iterable, List, Tuple, TypeVar
+from unicodedata import normalize as unicode_normalize
+
+T = TypeVar("T")
+_SEPARATORS = compile(r"[\W_]+")
+TITLE_FIELDS = ("title", "name", "russian", "english", "japanese", "licenseNameRu", "synonyms")
+
+
+def normalize(text: str) -> str:
+    """
+    NFKC-normalizes and casefolds ``text``, runs of punctuation and whitespace become a single space
+    """
+    return _SEPARATORS.sub(" ", unicode_normalize("NFKC", text).casefold()).strip()
+
+
+@lru_cache(maxsize=65536)
+def trigrams(text: str) -> frozenset:
+    """
+    Character trigrams of the normalized ``text``, padded with spaces so word boundaries count
+    """
+    text = f" {normalize(text)} "
+    if len(text) <= 3:
+        return frozenset((text,)) if text.strip() else frozenset()
+    return frozenset(map("".join, zip(text, text[1:], text[2:])))
+
+
+def _strings(value: Any) -> Iterable[str]:
+    if isinstance(value, str):
+        yield value
+    elif isinstance(value, dict):
+        for nested in value.values():
+            yield from _strings(nested)
+    elif isinstance(value, (list, tuple)):
+        for nested in value:
+            yield from _strings(nested)
+
+
+def item_titles(item: Any) -> List[str]:
+    """
+    All titles of an item or of a raw item dict: every language of ``title`` and ``name`` and the synonyms,
+    including the titles kept in the raw provider data
+    """
+    fields = item if isinstance(item, dict) else item.__dict__
+    raw = fields.get("data")
+    values = [fields.get(field) for field in TITLE_FIELDS]
+    if isinstance(raw, dict):
+        values.extend(raw.get(field) for field in TITLE_FIELDS)
+    return [title for title in dict.fromkeys(_strings(values)) if title.strip()]
+
+
+class TitleIndex(Generic[T]):
+    """
+    In-memory index ranking items by how close one of their titles is to a query. Titles are compared as
+    sets of character trigrams with cosine similarity, so word order, punctuation, case and small typos
+    matter little and Russian, Japanese and romaji titles are matched as well as English ones.
+
+    Args:
+        items: Items to index, see :meth:`add`
+    """
+
+    def __init__(self, items: Iterable[T] = ()):
+        self.items: List[T] = []
+        self._owners: List[int] = []
+        self._norms: List[float] = []
+        self._postings: Dict[str, List[int]] = defaultdict(list)
+        self.extend(items)
+
+    def add(self, item: T, titles: Iterable[str] = None) -> int:
+        """
+        Adds an item and returns its position.
+
+        Args:
+            item: Item to index, an :class:`~moe_parsers.core.items._BaseItem` or a dict
+            titles: Titles to index instead of the ones found by :func:`item_titles`
+        """
+        position, postings = len(self.items), self._postings
+        self.items.append(item)
+        for title in dict.fromkeys(item_titles(item) if titles is None else titles):
+            grams = trigrams(title)
+            if not grams:
+                continue
+            vector = len(self._owners)
+            self._owners.append(position)
+            self._norms.append(sqrt(len(grams)))
+            for gram in grams:
+                postings[gram].append(vector)
+        return position
+
+    def extend(self, items: Iterable[T]):
+        for item in items:
+            self.add(item)
+
+    def __len__(self) -> int:
+        return len(self.items)
+
+    def scores(self, query: str) -> List[float]:
+        """
+        Similarity between ``query`` and each item, from 0 to 1, in the order the items were added
+        """
+        grams = trigrams(query)
+        result = [0.0] * len(self.items)
+        if not grams:
+            return result
+        overlaps = Counter(chain.from_iterable(self._postings.get(gram, ()) for gram in grams))
+        query_norm = sqrt(len(grams))
+        for vector, overlap in overlaps.items():
+            score = overlap / (self._norms[vector] * query_norm)
+            owner = self._owners[vector]
+            if score > result[owner]:
+                result[owner] = score
+        return result
+
+    def top_k(self, query: str, k: int = 10, min_score: float = 0.0) -> List[Tuple[float, T]]:
+        """
+        Returns up to ``k`` ``(score, item)`` pairs scoring above ``min_score``, best first
+        """
+        scores = self.scores(query)
+        best = nlargest(k, (position for position, score in enumerate(scores) if score > min_score), scores.__getitem__)
+        return [(scores[position], self.items[position]) for position in best]
+
+    def rank(self, query: str) -> List[T]:
+        """
+        Returns all items sorted by similarity to ``query``, items with equal scores keep their order
+        """
+        scores = self.scores(query)
+        return [self.items[position] for position in sorted(range(len(scores)), key=lambda i: -scores[i])]
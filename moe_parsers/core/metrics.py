@@ -0,0 +1,143 @@
+from bisect import bisect_left
+from inspect import isawaitable
+from typing import Any, Callable, Dict, Literal, Tuple
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class Histogram:
+    __slots__ = ("buckets", "counts", "sum", "count")
+
+    def __init__(self, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self) -> Dict[str, int]:
+        result, total = {}, 0
+        for bound, count in zip((*self.buckets, float("inf")), self.counts):
+            total += count
+            result["+Inf" if bound == float("inf") else str(bound)] = total
+        return result
+
+    def quantile(self, q: float) -> float | None:
+        """
+        Estimates a quantile by linear interpolation inside the bucket that contains it
+        """
+        if not self.count:
+            return None
+        rank, seen = q * self.count, 0
+        for i, count in enumerate(self.counts):
+            if seen + count >= rank and count:
+                lower = self.buckets[i - 1] if i > 0 else 0.0
+                upper = self.buckets[i] if i < len(self.buckets) else self.buckets[-1]
+                return lower + (upper - lower) * (rank - seen) / count
+            seen += count
+        return self.buckets[-1]
+
+
+class Metrics:
+    """
+    Counters, latency histograms and request hooks of a client.
+
+    Hooks are registered with :meth:`on` and called with keyword arguments describing the request:
+    ``before_request`` (method, url, proxy, attempt), ``after_response`` (method, url, proxy, attempt, status,
+    elapsed, response) and ``on_retry`` (method, url, proxy, attempt, delay, reason). Coroutine hooks are awaited.
+    """
+
+    def __init__(self, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.counters: Dict[str, Dict[Tuple[Tuple[str, str], ...], float]] = {}
+        self.histograms: Dict[str, Dict[Tuple[Tuple[str, str], ...], Histogram]] = {}
+        self.hooks: Dict[str, list] = {"before_request": [], "after_response": [], "on_retry": []}
+
+    def on(self, event: Literal["before_request", "after_response", "on_retry"], callback: Callable[..., Any]):
+        self.hooks[event].append(callback)
+        return callback
+
+    async def emit(self, event: str, **data):
+        for callback in self.hooks[event]:
+            result = callback(**data)
+            if isawaitable(result):
+                await result
+
+    def inc(self, name: str, value: float = 1, **labels: str):
+        series = self.counters.setdefault(name, {})
+        key = tuple(sorted((k, str(v)) for k, v in labels.items()))
+        series[key] = series.get(key, 0) + value
+
+    def observe(self, name: str, value: float, **labels: str):
+        series = self.histograms.setdefault(name, {})
+        key = tuple(sorted((k, str(v)) for k, v in labels.items()))
+        histogram = series.get(key)
+        if histogram is None:
+            histogram = series[key] = Histogram(self.buckets)
+        histogram.observe(value)
+
+    def snapshot(self) -> dict:
+        return {
+            "counters": {
+                name: [{"labels": dict(key), "value": value} for key, value in series.items()]
+                for name, series in self.counters.items()
+            },
+            "histograms": {
+                name: [
+                    {
+                        "labels": dict(key),
+                        "count": histogram.count,
+                        "sum": histogram.sum,
+                        "p50": histogram.quantile(0.5),
+                        "p95": histogram.quantile(0.95),
+                        "p99": histogram.quantile(0.99),
+                        "buckets": histogram.cumulative(),
+                    }
+                    for key, histogram in series.items()
+                ]
+                for name, series in self.histograms.items()
+            },
+        }
+
+    @staticmethod
+    def _labels(labels: Tuple[Tuple[str, str], ...] | dict, **extra: str) -> str:
+        pairs = [*(labels.items() if isinstance(labels, dict) else labels), *extra.items()]
+        if not pairs:
+            return ""
+        return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in pairs) + "}"
+
+    def prometheus(self, prefix: str = "moe_parsers", gauges: Dict[str, Dict[str, float]] = None) -> str:
+        """
+        Renders all metrics in the Prometheus text exposition format.
+
+        Args:
+            prefix: Prefix of every metric name
+            gauges: Extra gauge values to export, ``{name: {label value: value}}`` with a ``key`` label
+        """
+        lines = []
+        for name, series in self.counters.items():
+            lines.append(f"# TYPE {prefix}_{name} counter")
+            lines.extend(f"{prefix}_{name}{self._labels(key)} {value}" for key, value in series.items())
+        for name, series in self.histograms.items():
+            lines.append(f"# TYPE {prefix}_{name} histogram")
+            for key, histogram in series.items():
+                for bound, count in histogram.cumulative().items():
+                    lines.append(f"{prefix}_{name}_bucket{self._labels(key, le=bound)} {count}")
+                lines.append(f"{prefix}_{name}_sum{self._labels(key)} {histogram.sum}")
+                lines.append(f"{prefix}_{name}_count{self._labels(key)} {histogram.count}")
+        for name, values in (gauges or {}).items():
+            lines.append(f"# TYPE {prefix}_{name} gauge")
+            lines.extend(
+                f"{prefix}_{name}{self._labels({'key': key} if key else {})} {value}"
+                for key, value in values.items()
+                if value is not None
+            )
+        return "\n".join(lines) + "\n"
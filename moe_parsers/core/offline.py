@@ -0,0 +1,366 @@
+from array import array
+from bisect import bisect_left
+from collections import Counter, defaultdict
+from enum import Enum
+from json import dumps, loads
+from math import sqrt
+from mmap import mmap, ACCESS_READ
+from os import replace
+from pathlib import Path
+from shutil import rmtree
+from typing import Any, Dict, Iterable, Iterator, List, Set, Tuple
+
+from .matching import item_titles, normalize, trigrams
+
+MANIFEST = "manifest.json"
+_FILES = ("docs.bin", "docs.u32", "terms.bin", "terms.u32", "postings.u32", "vectors.u32")
+
+
+def item_record(item: Any) -> dict:
+    """
+    Compact record stored for an item or a raw item dict: its type, ids, url and every title
+    """
+    fields = item if isinstance(item, dict) else item.__dict__
+    ids = {}
+    for id_type, value in (fields.get("ids") or {}).items():
+        if value is not None:
+            ids[id_type.value if isinstance(id_type, Enum) else str(id_type)] = value
+    for name, value in fields.items():
+        if name.endswith("_id") and name != "item_id" and value is not None and isinstance(value, (int, str)):
+            ids.setdefault(name[:-3], value)
+    item_type = fields.get("item_type") if isinstance(item, dict) else item.__class__.__name__.lower()
+    return {
+        "type": item_type.value if isinstance(item_type, Enum) else item_type,
+        "ids": ids,
+        "url": fields.get("url") or None,
+        "titles": item_titles(item),
+    }
+
+
+def _write_segment(path: Path, records: Dict[str, dict | None]):
+    docs, doc_offsets = bytearray(), array("I", [0])
+    terms: Dict[str, List[int]] = defaultdict(list)
+    vectors = array("I")
+    for doc, key in enumerate(sorted(records)):
+        record = records[key]
+        docs += key.encode() + b"\t"
+        if record is not None:
+            docs += dumps(record, ensure_ascii=False, default=str).encode()
+            ids = {f"i:{value}" for value in record["ids"].values()}
+            ids.update(f"i:{id_type}:{value}" for id_type, value in record["ids"].items())
+            words: Set[str] = set()
+            for title in record["titles"]:
+                grams = trigrams(title)
+                if grams:
+                    vector = len(vectors) // 2
+                    vectors.extend((doc, len(grams)))
+                    for gram in grams:
+                        terms[f"g:{gram}"].append(vector)
+                words.update(normalize(title).split())
+            for term in ids | {f"w:{word}" for word in words}:
+                terms[term].append(doc)
+        doc_offsets.append(len(docs))
+
+    term_bytes, term_offsets, postings, posting_offsets = bytearray(), array("I", [0]), array("I"), array("I", [0])
+    for term in sorted(terms):
+        term_bytes += term.encode()
+        term_offsets.append(len(term_bytes))
+        postings.extend(terms[term])
+        posting_offsets.append(len(postings))
+
+    # the segment is built aside and renamed into place, leftovers of an interrupted write are discarded
+    temporary = path.with_name(f".{path.name}.tmp")
+    for leftover in (temporary, path):
+        if leftover.exists():
+            rmtree(leftover)
+    temporary.mkdir(parents=True)
+    for name, data in zip(_FILES, (docs, doc_offsets, term_bytes, term_offsets + posting_offsets, postings, vectors)):
+        (temporary / name).write_bytes(data if isinstance(data, bytearray) else data.tobytes())
+    replace(temporary, path)
+
+
+class _Segment:
+    """
+    Read-only view of a segment directory. Every file is memory-mapped, integers are native-endian uint32:
+
+    - ``docs.bin``: ``key\\tjson`` records sorted by key, a key without json is a deletion
+    - ``docs.u32``: offsets of the records in ``docs.bin``
+    - ``terms.bin`` and ``terms.u32``: sorted terms followed by the offsets of their postings
+    - ``postings.u32``: document ids for word (``w:``) and id (``i:``) terms, title vector ids for trigram
+      (``g:``) terms
+    - ``vectors.u32``: document id and number of trigrams of every title vector
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        self._maps: List[mmap] = []
+        self._views: List[memoryview] = []
+        self.docs = self._map("docs.bin")
+        self.doc_offsets = self._array("docs.u32")
+        self.term_bytes = self._map("terms.bin")
+        offsets = self._array("terms.u32")
+        self.term_offsets = self._view(offsets[: len(offsets) // 2])
+        self.posting_offsets = self._view(offsets[len(offsets) // 2 :])
+        self.postings = self._array("postings.u32")
+        self.vectors = self._array("vectors.u32")
+
+    def _map(self, name: str) -> mmap | bytes:
+        with open(self.path / name, "rb") as file:
+            if not file.seek(0, 2):
+                return b""
+            mapped = mmap(file.fileno(), 0, access=ACCESS_READ)
+        self._maps.append(mapped)
+        return mapped
+
+    def _view(self, view: memoryview) -> memoryview:
+        self._views.append(view)
+        return view
+
+    def _array(self, name: str) -> memoryview:
+        return self._view(memoryview(self._map(name)).cast("I"))
+
+    def __len__(self) -> int:
+        return len(self.doc_offsets) - 1
+
+    def _entry(self, doc: int) -> bytes:
+        return self.docs[self.doc_offsets[doc] : self.doc_offsets[doc + 1]]
+
+    def key(self, doc: int) -> bytes:
+        return self._entry(doc).split(b"\t", 1)[0]
+
+    def record(self, doc: int) -> dict | None:
+        data = self._entry(doc).split(b"\t", 1)[1]
+        return loads(data) if data else None
+
+    def find_key(self, key: bytes) -> int | None:
+        doc = bisect_left(range(len(self)), key, key=self.key)
+        return doc if doc < len(self) and self.key(doc) == key else None
+
+    def _term(self, index: int) -> bytes:
+        return self.term_bytes[self.term_offsets[index] : self.term_offsets[index + 1]]
+
+    def _postings(self, index: int) -> List[int]:
+        return self.postings[self.posting_offsets[index] : self.posting_offsets[index + 1]].tolist()
+
+    def term(self, term: str) -> List[int]:
+        term = term.encode()
+        index = bisect_left(range(len(self.term_offsets) - 1), term, key=self._term)
+        return self._postings(index) if index < len(self.term_offsets) - 1 and self._term(index) == term else []
+
+    def prefix(self, prefix: str) -> Set[int]:
+        prefix, count = prefix.encode(), len(self.term_offsets) - 1
+        index, found = bisect_left(range(count), prefix, key=self._term), set()
+        while index < count and self._term(index).startswith(prefix):
+            found.update(self._postings(index))
+            index += 1
+        return found
+
+    def scores(self, grams: frozenset) -> Dict[int, float]:
+        overlaps = Counter(vector for gram in grams for vector in self.term(f"g:{gram}"))
+        query_norm, scores = sqrt(len(grams)), {}
+        for vector, overlap in overlaps.items():
+            doc = self.vectors[2 * vector]
+            score = overlap / (sqrt(self.vectors[2 * vector + 1]) * query_norm)
+            if score > scores.get(doc, 0.0):
+                scores[doc] = score
+        return scores
+
+    def close(self):
+        for view in reversed(self._views):
+            view.release()
+        for mapped in self._maps:
+            mapped.close()
+        self._views, self._maps = [], []
+
+
+class OfflineIndex:
+    """
+    On-disk title index for resolving names without hitting the providers. Items of any provider are added
+    as compact records (type, ids, url and all titles) and answer fuzzy (:meth:`search`), prefix
+    (:meth:`prefix`) and id (:meth:`get`, :meth:`find`) queries. Titles are matched with the trigrams of
+    :mod:`moe_parsers.core.matching`.
+
+    Every :meth:`commit` writes the pending changes as a new immutable segment of memory-mapped files, so
+    updates never rewrite existing data. A key present in several segments resolves to the newest one,
+    :meth:`compact` merges the segments and drops replaced and deleted records. Only one writer may use a
+    directory at a time; changes are visible to queries after :meth:`commit`.
+
+    Args:
+        path: Directory of the index, created if missing
+        max_segments: Segments allowed before a commit compacts the index
+    """
+
+    def __init__(self, path: str | Path, max_segments: int = 16):
+        self.path = Path(path)
+        self.path.mkdir(parents=True, exist_ok=True)
+        self.max_segments = max_segments
+        self._pending: Dict[str, dict | None] = {}
+        manifest = self.path / MANIFEST
+        state = loads(manifest.read_text("utf-8")) if manifest.exists() else {"segments": [], "next": 1}
+        self._next: int = state["next"]
+        self._segments = [_Segment(self.path / name) for name in state["segments"]]
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, *exc_info):
+        if exc_type is None:
+            self.commit()
+        self.close()
+
+    @staticmethod
+    def key(record: dict) -> str:
+        """
+        Default key of a record, its first id as ``type:id``
+        """
+        for id_type, value in record["ids"].items():
+            return f"{id_type}:{value}"
+        raise ValueError(f"Item without ids needs an explicit key: {record['titles'][:1]}")
+
+    def add(self, item: Any, key: str = None) -> str:
+        """
+        Adds or replaces an item and returns its key.
+
+        Args:
+            item: :class:`~moe_parsers.core.items.Anime`, :class:`~moe_parsers.core.items.Manga` or any other
+                item or raw item dict
+            key: Key of the item, :meth:`key` by default
+        """
+        record = item_record(item)
+        key = key or self.key(record)
+        if "\t" in key:
+            raise ValueError(f"Invalid key {key!r}")
+        self._pending[key] = record
+        return key
+
+    def extend(self, items: Iterable[Any]):
+        for item in items:
+            self.add(item)
+
+    def delete(self, key: str):
+        self._pending[key] = None
+
+    def commit(self):
+        """
+        Writes the pending changes as a new segment
+        """
+        if not self._pending:
+            return
+        name = f"{self._next:06d}"
+        _write_segment(self.path / name, self._pending)
+        self._segments.append(_Segment(self.path / name))
+        self._next += 1
+        self._pending = {}
+        self._save()
+        if len(self._segments) > self.max_segments:
+            self.compact()
+
+    def _save(self):
+        state = {"segments": [segment.path.name for segment in self._segments], "next": self._next}
+        temporary = self.path / f"{MANIFEST}.tmp"
+        temporary.write_text(dumps(state), "utf-8")
+        replace(temporary, self.path / MANIFEST)
+
+    def compact(self):
+        """
+        Merges all segments into one, keeping only the newest record of every key
+        """
+        if len(self._segments) < 2:
+            return
+        records = dict(self.records())
+        old, name = self._segments, f"{self._next:06d}"
+        if records:
+            _write_segment(self.path / name, records)
+        self._segments = [_Segment(self.path / name)] if records else []
+        self._next += 1
+        self._save()
+        for segment in old:
+            segment.close()
+            rmtree(segment.path)
+
+    def _visible(self, position: int, key: bytes) -> bool:
+        return all(segment.find_key(key) is None for segment in self._segments[position + 1 :])
+
+    def records(self) -> Iterator[Tuple[str, dict]]:
+        """
+        Yields the ``(key, record)`` pairs of all indexed items
+        """
+        for position, segment in enumerate(self._segments):
+            for doc in range(len(segment)):
+                key = segment.key(doc)
+                if self._visible(position, key) and (record := segment.record(doc)) is not None:
+                    yield key.decode(), record
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self.records())
+
+    def get(self, key: str) -> dict | None:
+        """
+        Returns the record stored under ``key``
+        """
+        for segment in reversed(self._segments):
+            doc = segment.find_key(key.encode())
+            if doc is not None:
+                return segment.record(doc)
+        return None
+
+    def find(self, value: str | int, id_type: str = None) -> List[dict]:
+        """
+        Returns the records having the id ``value``, of type ``id_type`` if given (e.g. ``"shikimori"``)
+        """
+        term = f"i:{id_type}:{value}" if id_type else f"i:{value}"
+        candidates = {
+            position: dict.fromkeys(segment.term(term), 1.0) for position, segment in enumerate(self._segments)
+        }
+        return [record for _, record in self._best(candidates)]
+
+    def _best(self, candidates: Dict[int, Dict[int, float]], k: int = None) -> List[Tuple[float, dict]]:
+        ranked = sorted(
+            ((score, position, doc) for position, docs in candidates.items() for doc, score in docs.items()),
+            key=lambda candidate: (-candidate[0], -candidate[1], candidate[2]),
+        )
+        results = []
+        for score, position, doc in ranked:
+            segment = self._segments[position]
+            if self._visible(position, segment.key(doc)):
+                results.append((score, segment.record(doc)))
+                if k is not None and len(results) >= k:
+                    break
+        return results
+
+    def search(self, query: str, k: int = 10, min_score: float = 0.0) -> List[Tuple[float, dict]]:
+        """
+        Fuzzy search, returns up to ``k`` ``(score, record)`` pairs scoring above ``min_score``, best first
+        """
+        grams = trigrams(query)
+        if not grams:
+            return []
+        candidates = {
+            position: {doc: score for doc, score in segment.scores(grams).items() if score > min_score}
+            for position, segment in enumerate(self._segments)
+        }
+        return self._best(candidates, k)
+
+    def prefix(self, query: str, k: int = 10) -> List[Tuple[float, dict]]:
+        """
+        Autocompletion, returns up to ``k`` ``(score, record)`` pairs of items with a title containing every
+        word of ``query``, the last one possibly incomplete, ranked by similarity to ``query``
+        """
+        words = normalize(query).split()
+        if not words:
+            return []
+        grams, candidates = trigrams(query), {}
+        for position, segment in enumerate(self._segments):
+            docs = segment.prefix(f"w:{words[-1]}")
+            for word in words[:-1]:
+                if not docs:
+                    break
+                docs.intersection_update(segment.term(f"w:{word}"))
+            if docs:
+                scores = segment.scores(grams)
+                candidates[position] = {doc: scores.get(doc, 0.0) for doc in docs}
+        return self._best(candidates, k)
+
+    def close(self):
+        for segment in self._segments:
+            segment.close()
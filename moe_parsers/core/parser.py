@@ -1,7 +1,52 @@
 from .adapter import Client
-from typing import TypedDict, Unpack, Literal
+from .romaji import Romanizer, default_romanizer
+from asyncio import Queue, create_task, gather, get_running_loop
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
+from typing import TypedDict, Unpack, Literal, Any, AsyncGenerator, Awaitable, Callable, Dict, Iterable, TypeVar
 from enum import Enum
 
+T = TypeVar("T")
+_executors: Dict[str, Executor] = {}
+
+
+def shared_executor(kind: Literal["process", "thread"] = "process") -> Executor:
+    """
+    Returns the pool shared by all parsers created with ``executor=kind``, the pool is started on the first call
+    """
+    if kind not in ("process", "thread"):
+        raise ValueError(f"Unknown executor {kind!r}, expected 'process' or 'thread'")
+    if kind not in _executors:
+        _executors[kind] = ProcessPoolExecutor() if kind == "process" else ThreadPoolExecutor(thread_name_prefix="moe")
+    return _executors[kind]
+
+
+class BatchResult:
+    """
+    Outcome of one item of a batch started with :meth:`_Parser.map_ids`.
+
+    Args:
+        index: Position of the item in the input
+        key: The item itself (an id or an url)
+        result: Value returned for the item, None if it failed
+        error: Exception raised for the item, None if it succeeded
+    """
+
+    __slots__ = ("index", "key", "result", "error")
+
+    def __init__(self, index: int, key: Any, result: Any = None, error: BaseException | None = None):
+        self.index = index
+        self.key = key
+        self.result = result
+        self.error = error
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+    def __repr__(self):
+        return f"<BatchResult [{self.index}] {self.key!r} {'ok' if self.ok else repr(self.error)}>"
+
 
 class _Parser:
     class Language(Enum):
@@ -12,10 +57,117 @@ class _Parser:
     class ParserParams(TypedDict, total=False):
         client: Client
         language: Literal["EN", "JP", "RU"]
+        romanizer: Romanizer
+        romanize: bool
+        executor: Executor | Literal["process", "thread"] | None
 
     def __init__(self, **params: Unpack[ParserParams]):
         self.__dict__.update(**params)
 
+    async def __aenter__(self):
+        await self.client.__aenter__()
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    async def close(self):
+        await self.client.close()
+
+    async def run_cpu(self, func: Callable[..., T], *args, **kwargs) -> T:
+        """
+        Runs a CPU-bound step (parsing a page, converting an API response) in the executor of the parser so it
+        does not block other requests on the event loop. Without an executor ``func`` is called directly.
+        With a process pool ``func`` must be a module-level function or a classmethod and its arguments and
+        result must be picklable.
+        """
+        executor = self.__dict__.get("executor")
+        if executor is None:
+            return func(*args, **kwargs)
+        if isinstance(executor, str):
+            executor = shared_executor(executor)
+        return await get_running_loop().run_in_executor(executor, partial(func, *args, **kwargs))
+
+    async def map_ids(
+        self,
+        func: Callable[[Any], Awaitable[Any]],
+        items: Iterable[Any],
+        concurrency: int = 10,
+        ordered: bool = False,
+        progress: Callable[[int, int | None, int], Any] = None,
+    ) -> AsyncGenerator[BatchResult, None]:
+        """
+        Runs ``func`` for every item with at most ``concurrency`` calls in flight and yields a
+        :class:`BatchResult` per item. Items are pulled from ``items`` lazily, so it can be a generator over
+        millions of ids. A failing item is reported through :attr:`BatchResult.error` and does not cancel the
+        rest of the batch.
+
+        Args:
+            func: Coroutine function called with each item
+            items: Ids, urls or any other arguments of ``func``
+            concurrency: Maximum number of concurrent calls
+            ordered: Yield results in the input order instead of as they complete
+            progress: Called with ``(done, total, failed)`` after each item, ``total`` is None for iterables
+                without a length
+        """
+        total = len(items) if hasattr(items, "__len__") else None
+        pending = enumerate(items)
+        finished = Queue()
+
+        async def worker():
+            try:
+                for index, key in pending:
+                    try:
+                        result = BatchResult(index, key, await func(key))
+                    except Exception as exc:
+                        result = BatchResult(index, key, error=exc)
+                    finished.put_nowait(result)
+            finally:
+                finished.put_nowait(None)
+
+        workers = [create_task(worker()) for _ in range(max(1, concurrency))]
+        running, done, failed, buffered, next_index = len(workers), 0, 0, {}, 0
+        try:
+            while running:
+                result = await finished.get()
+                if result is None:
+                    running -= 1
+                    continue
+                done += 1
+                failed += not result.ok
+                if progress is not None:
+                    progress(done, total, failed)
+                if not ordered:
+                    yield result
+                    continue
+                buffered[result.index] = result
+                while next_index in buffered:
+                    yield buffered.pop(next_index)
+                    next_index += 1
+            # re-raises errors of the input iterable itself
+            await gather(*workers)
+        finally:
+            for task in workers:
+                task.cancel()
+            await gather(*workers, return_exceptions=True)
+
+    async def gather_info(
+        self,
+        items: Iterable[Any],
+        concurrency: int = 10,
+        ordered: bool = False,
+        progress: Callable[[int, int | None, int], Any] = None,
+        **kwargs,
+    ) -> AsyncGenerator[BatchResult, None]:
+        """
+        Calls ``get_info`` of the parser for every id or url of ``items``, see :meth:`map_ids`.
+        Extra keyword arguments are passed to ``get_info``.
+        """
+        async for result in self.map_ids(
+            lambda item: self.get_info(item, **kwargs), items, concurrency, ordered, progress
+        ):
+            yield result
+
 
 class Parser(_Parser):
     def __init__(self, **params: Unpack[_Parser.ParserParams]):
@@ -27,4 +179,7 @@ class Parser(_Parser):
         """
         self.language = "EN"
         self.client = Client()
+        self.romanizer = default_romanizer
+        self.romanize = True
+        self.executor = None
         self.__dict__.update(**params)
@@ -0,0 +1,540 @@
+from asyncio import create_task, gather, sleep, Semaphore, Task
+from collections import deque
+from datetime import datetime
+from heapq import heappush, heappop, heapify
+from random import random
+from time import monotonic
+from typing import TypedDict, Literal, Unpack, List, Dict, Iterable, Callable, Any, TYPE_CHECKING
+from urllib.parse import urlparse
+
+if TYPE_CHECKING:
+    from .adapter import Client
+
+
+class _ProxyParams(TypedDict, total=False):
+    protocol: Literal["http", "https", "socks4", "socks5"]
+    ip: str
+    port: str
+    username: str
+    password: str
+
+
+class CircuitBreaker:
+    """
+    Takes a proxy out of rotation after ``failure_threshold`` consecutive failures. Once ``reset_timeout``
+    seconds have passed the breaker is half-open and lets a trial request (or health probe) through: a success
+    closes it, a failure opens it again.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int = 3, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return self.CLOSED
+        return self.HALF_OPEN if monotonic() >= self.opened_at + self.reset_timeout else self.OPEN
+
+    def record_success(self):
+        self.failures = 0
+        self.opened_at = None
+
+    def record_failure(self):
+        self.failures += 1
+        if self.opened_at is not None or self.failures >= self.failure_threshold:
+            self.opened_at = monotonic()
+
+    def __repr__(self):
+        return f"CircuitBreaker({self.state}, failures={self.failures})"
+
+
+class Proxy:
+    def __init__(self, *args, url: str = None, **kwargs: Unpack[_ProxyParams]):
+        self.latency = None
+        self.ewma_latency = None
+        self.failure_rate = 0.0
+        self.breaker = CircuitBreaker()
+        self.client = None
+        self.last_used = None
+        self.use_count = 0
+        if url or len(args) == 1:
+            parsed = urlparse(url or args[0])
+            self.ip = parsed.hostname
+            self.port = parsed.port
+            self.protocol = parsed.scheme
+            self.username = parsed.username
+            self.password = parsed.password
+        elif args:
+            self.ip = args[0]
+            self.port = args[1]
+            self.protocol = args[4] if len(args) > 4 else kwargs.get("protocol", "http")
+            self.username = args[2] if len(args) > 2 else kwargs.get("username", None)
+            self.password = args[3] if len(args) > 3 else kwargs.get("password", None)
+        self.__dict__.update(**kwargs)
+
+    @property
+    def url(self):
+        return (
+            f"{self.protocol}://{self.username}:{self.password}@{self.ip}:{self.port}"
+            if self.username and self.password
+            else f"{self.protocol}://{self.ip}:{self.port}"
+        )
+
+    def record_latency(self, latency: int, alpha: float = 0.3):
+        """
+        Stores the latency of the last request in milliseconds and updates the moving average.
+        """
+        self.latency = latency
+        self.ewma_latency = latency if self.ewma_latency is None else alpha * latency + (1 - alpha) * self.ewma_latency
+
+    def record_result(self, ok: bool, alpha: float = 0.1):
+        self.failure_rate = alpha * (not ok) + (1 - alpha) * self.failure_rate
+        if ok:
+            self.breaker.record_success()
+        else:
+            self.breaker.record_failure()
+
+    def __repr__(self):
+        return f"Proxy({self.url})"
+
+
+class ProxyStrategy:
+    """
+    Decides which proxy a :class:`ProxySwithcher` hands out next. Strategies keep their own index of the pool
+    and are notified about every change, so picking never scans or sorts the whole pool.
+    """
+
+    def add(self, proxy: Proxy):
+        """
+        Adds a proxy to the index or updates its position if it is already there
+        """
+
+    def remove(self, proxy: Proxy): ...
+
+    def update(self, proxy: Proxy): ...
+
+    def pick(self, ignore: Iterable[str]) -> Proxy | None: ...
+
+
+class _HeapStrategy(ProxyStrategy):
+    """
+    Keeps proxies in a heap ordered by :meth:`key`. Updates push a new entry and outdated ones are skipped
+    when they reach the top, so add, update and pick are O(log n).
+    """
+
+    def __init__(self):
+        self._heap = []
+        self._entries: Dict[str, int] = {}
+        self._proxies: Dict[str, Proxy] = {}
+        self._seq = 0
+
+    def key(self, proxy: Proxy) -> tuple:
+        raise NotImplementedError
+
+    def add(self, proxy: Proxy):
+        self._seq += 1
+        self._entries[proxy.url] = self._seq
+        self._proxies[proxy.url] = proxy
+        heappush(self._heap, (self.key(proxy), self._seq, proxy.url))
+        if len(self._heap) > 2 * len(self._entries) + 64:
+            self._heap = [entry for entry in self._heap if self._entries.get(entry[2]) == entry[1]]
+            heapify(self._heap)
+
+    update = add
+
+    def remove(self, proxy: Proxy):
+        self._entries.pop(proxy.url, None)
+        self._proxies.pop(proxy.url, None)
+
+    def pick(self, ignore: Iterable[str]) -> Proxy | None:
+        skipped, picked = [], None
+        while self._heap:
+            entry = self._heap[0]
+            if self._entries.get(entry[2]) != entry[1]:
+                heappop(self._heap)
+            elif entry[2] in ignore:
+                skipped.append(heappop(self._heap))
+            else:
+                picked = self._proxies[entry[2]]
+                break
+        for entry in skipped:
+            heappush(self._heap, entry)
+        return picked
+
+
+class LeastUsed(_HeapStrategy):
+    """
+    Picks the proxy with the lowest use count, preferring lower latency on ties
+    """
+
+    def key(self, proxy: Proxy) -> tuple:
+        return proxy.use_count, proxy.latency if proxy.latency is not None else float("inf")
+
+
+class LowestLatency(_HeapStrategy):
+    """
+    Picks the proxy with the lowest moving average latency; unmeasured proxies are tried first
+    """
+
+    def key(self, proxy: Proxy) -> tuple:
+        return proxy.ewma_latency if proxy.ewma_latency is not None else 0.0, proxy.use_count
+
+
+class RoundRobin(ProxyStrategy):
+    """
+    Hands out proxies in turn
+    """
+
+    def __init__(self):
+        self._queue = deque()
+        self._proxies: Dict[str, Proxy] = {}
+
+    def add(self, proxy: Proxy):
+        if proxy.url not in self._proxies:
+            self._queue.append(proxy.url)
+        self._proxies[proxy.url] = proxy
+
+    def remove(self, proxy: Proxy):
+        self._proxies.pop(proxy.url, None)
+
+    def pick(self, ignore: Iterable[str]) -> Proxy | None:
+        for _ in range(len(self._queue)):
+            url = self._queue.popleft()
+            if url not in self._proxies:
+                continue
+            self._queue.append(url)
+            if url not in ignore:
+                return self._proxies[url]
+        return None
+
+
+class WeightedRandom(ProxyStrategy):
+    """
+    Picks a random proxy with probability proportional to :meth:`weight` (by default the inverse of its
+    moving average latency), using a Fenwick tree so sampling and updates are O(log n).
+    """
+
+    def __init__(self, attempts: int = 8):
+        self.attempts = attempts
+        self._tree = [0.0]
+        self._weights: List[float] = []
+        self._proxies: List[Proxy | None] = []
+        self._slots: Dict[str, int] = {}
+
+    def weight(self, proxy: Proxy) -> float:
+        return 1000 / ((proxy.ewma_latency or 100) + 10)
+
+    def _prefix(self, n: int) -> float:
+        total = 0.0
+        while n > 0:
+            total += self._tree[n]
+            n -= n & -n
+        return total
+
+    def _set(self, slot: int, weight: float):
+        delta, self._weights[slot] = weight - self._weights[slot], weight
+        i = slot + 1
+        while i < len(self._tree):
+            self._tree[i] += delta
+            i += i & -i
+
+    def add(self, proxy: Proxy):
+        if proxy.url in self._slots:
+            return self.update(proxy)
+        if len(self._proxies) > 2 * len(self._slots) + 64:
+            alive = [other for other in self._proxies if other is not None]
+            self.__init__(self.attempts)
+            for other in alive:
+                self.add(other)
+        weight = self.weight(proxy)
+        self._slots[proxy.url] = len(self._weights)
+        self._weights.append(weight)
+        self._proxies.append(proxy)
+        i = len(self._weights)
+        self._tree.append(weight + self._prefix(i - 1) - self._prefix(i - (i & -i)))
+
+    def update(self, proxy: Proxy):
+        slot = self._slots.get(proxy.url)
+        if slot is not None:
+            self._set(slot, self.weight(proxy))
+
+    def remove(self, proxy: Proxy):
+        slot = self._slots.pop(proxy.url, None)
+        if slot is not None:
+            self._set(slot, 0.0)
+            self._proxies[slot] = None
+
+    def _sample(self) -> Proxy | None:
+        target, position = random() * self._prefix(len(self._weights)), 0
+        step = 1 << (len(self._weights).bit_length() - 1)
+        while step:
+            if position + step <= len(self._weights) and self._tree[position + step] <= target:
+                position += step
+                target -= self._tree[position]
+            step >>= 1
+        return self._proxies[position] if position < len(self._proxies) else None
+
+    def pick(self, ignore: Iterable[str]) -> Proxy | None:
+        if not self._slots:
+            return None
+        for _ in range(self.attempts):
+            proxy = self._sample()
+            if proxy is not None and proxy.url not in ignore:
+                return proxy
+        return next((proxy for proxy in self._proxies if proxy is not None and proxy.url not in ignore), None)
+
+
+STRATEGIES = {
+    "least_used": LeastUsed,
+    "latency": LowestLatency,
+    "round_robin": RoundRobin,
+    "weighted_random": WeightedRandom,
+}
+
+
+class ProxySwithcher:
+    """
+    Pool of proxies used by a client. Proxies are indexed by url and handed out by a :class:`ProxyStrategy`;
+    proxies whose :class:`CircuitBreaker` is open are kept out of rotation until it becomes half-open.
+
+    Args:
+        proxies: Initial proxies
+        strategy: Name from ``STRATEGIES`` or a strategy instance
+        check_url: Url requested through a proxy to check it, point it at a local endpoint for bulk imports
+        check_timeout: Timeout of a single check in seconds
+    """
+
+    client: "Client" = None
+    check_url: str = "https://httpbin.org/ip"
+    check_timeout: float = 5
+
+    def __init__(
+        self,
+        proxies: List[Proxy | str] = None,
+        strategy: Literal["least_used", "latency", "round_robin", "weighted_random"] | ProxyStrategy = "least_used",
+        check_url: str = None,
+        check_timeout: float = None,
+    ):
+        self.check_url = check_url or self.check_url
+        self.check_timeout = check_timeout or self.check_timeout
+        self._by_url: Dict[str, Proxy] = {}
+        self._open = []
+        self._health_task: Task | None = None
+        self.strategy = STRATEGIES[strategy]() if isinstance(strategy, str) else strategy
+        self.add(list(proxies or []))
+
+    @property
+    def proxies(self) -> List[Proxy]:
+        return list(self._by_url.values())
+
+    def __len__(self):
+        return len(self._by_url)
+
+    def get_client(self) -> "Client":
+        """
+        Returns the client shared by all proxy checks of the pool
+        """
+        if self.client is None:
+            from .adapter import Client
+
+            self.client = Client(limit=0, limit_per_host=0)
+        return self.client
+
+    async def close(self):
+        self.stop_health_checks()
+        if self.client is not None:
+            await self.client.close()
+
+    async def check(self, proxy: Proxy | str) -> Proxy | bool:
+        """
+        Requests ``check_url`` through the proxy, returns the proxy with its latency recorded or False
+        """
+        proxy = proxy if isinstance(proxy, Proxy) else Proxy(url=proxy)
+        try:
+            start = monotonic()
+            response = await self.get_client().request(
+                method="get",
+                url=self.check_url,
+                proxy=proxy.url,
+                timeout=self.check_timeout,
+                use_switcher=False,
+                max_retries=0,
+                cache=False,
+            )
+            if response.status != 200:
+                return False
+            proxy.record_latency(int((monotonic() - start) * 1000))
+            return proxy
+        except Exception:
+            return False
+
+    async def import_proxies(
+        self,
+        proxies: Iterable[Proxy | str],
+        concurrency: int = 100,
+        progress: Callable[[int, int | None, int], Any] = None,
+    ) -> List[Proxy]:
+        """
+        Checks proxies with at most ``concurrency`` checks in flight and adds the working ones to the pool.
+
+        Args:
+            proxies: Proxies or proxy urls, any iterable (it is consumed lazily)
+            concurrency: Maximum number of simultaneous checks
+            progress: Called as ``progress(done, total, valid)`` after every check, ``total`` is None
+                if ``proxies`` has no length
+
+        Returns:
+            List[Proxy]: Proxies that passed the check
+        """
+        total = len(proxies) if hasattr(proxies, "__len__") else None
+        iterator = iter(proxies)
+        valid, done = [], 0
+
+        async def worker():
+            nonlocal done
+            for proxy in iterator:
+                checked = await self.check(proxy)
+                done += 1
+                if checked:
+                    self.add(checked)
+                    valid.append(checked)
+                if progress is not None:
+                    progress(done, total, len(valid))
+
+        await gather(*[worker() for _ in range(max(1, min(concurrency, total or concurrency)))])
+        return valid
+
+    async def checkadd(self, proxy: Proxy | str | List[Proxy | str]):
+        if isinstance(proxy, list):
+            return await self.import_proxies(proxy)
+        _ = await self.check(proxy)
+        if _:
+            self.add(_)
+            return True
+        return False
+
+    def add(self, proxy: Proxy | str | List[Proxy | str]):
+        if isinstance(proxy, list):
+            for p in proxy:
+                self.add(p)
+            return
+        proxy = proxy if isinstance(proxy, Proxy) else Proxy(url=proxy)
+        if proxy.url in self._by_url:
+            self.strategy.remove(self._by_url[proxy.url])
+        self._by_url[proxy.url] = proxy
+        if proxy.breaker.state == CircuitBreaker.OPEN:
+            heappush(self._open, (proxy.breaker.opened_at + proxy.breaker.reset_timeout, proxy.url))
+        else:
+            self.strategy.add(proxy)
+
+    def remove(self, proxy: Proxy | str):
+        proxy = self._by_url.pop(proxy.url if isinstance(proxy, Proxy) else proxy, None)
+        if proxy is not None:
+            self.strategy.remove(proxy)
+
+    def sort(self) -> List[Proxy]:
+        return sorted(self.proxies, key=lambda x: (x.use_count, x.latency if x.latency is not None else float("inf")))
+
+    def pick(self, ignore: List[Proxy | str] = None) -> Proxy | None:
+        """
+        Returns the next proxy according to the strategy, skipping ``ignore`` unless nothing else is left.
+        """
+        self._release_due()
+        ignore = {proxy.url if isinstance(proxy, Proxy) else proxy for proxy in ignore or []}
+        return self.strategy.pick(ignore) or (self.strategy.pick(()) if ignore else None)
+
+    def _release_due(self):
+        """
+        Puts proxies whose breaker became half-open back into rotation for a trial request
+        """
+        while self._open and self._open[0][0] <= monotonic():
+            _, url = heappop(self._open)
+            proxy = self._by_url.get(url)
+            if proxy is not None and proxy.breaker.state != CircuitBreaker.OPEN:
+                self.strategy.add(proxy)
+
+    def use(self, proxy: Proxy):
+        proxy.last_used = datetime.now()
+        proxy.use_count += 1
+        if proxy.url in self._by_url and proxy.breaker.state != CircuitBreaker.OPEN:
+            self.strategy.update(proxy)
+
+    def report(self, proxy: Proxy, latency: int = None, ok: bool = True):
+        """
+        Records the outcome of a request made through ``proxy``, taking it out of rotation if its breaker opens.
+        """
+        if latency is not None:
+            proxy.record_latency(latency)
+        proxy.record_result(ok)
+        if proxy.url not in self._by_url:
+            return
+        if proxy.breaker.state == CircuitBreaker.OPEN:
+            self.strategy.remove(proxy)
+            heappush(self._open, (proxy.breaker.opened_at + proxy.breaker.reset_timeout, proxy.url))
+        else:
+            self.strategy.add(proxy)
+
+    async def probe(self, proxy: Proxy) -> bool:
+        """
+        Checks a proxy and records the result like a regular request
+        """
+        ok = bool(await self.check(proxy))
+        self.report(proxy, ok=ok)
+        return ok
+
+    async def health_check(self, concurrency: int = 20) -> Dict[str, int]:
+        """
+        Probes every proxy of the pool once with at most ``concurrency`` probes in flight.
+        Proxies with an open breaker are skipped until it becomes half-open.
+        """
+        semaphore = Semaphore(concurrency)
+
+        async def probe(proxy: Proxy) -> bool:
+            async with semaphore:
+                return await self.probe(proxy)
+
+        results = await gather(*[probe(proxy) for proxy in self.proxies if proxy.breaker.state != CircuitBreaker.OPEN])
+        return {"probed": len(results), "healthy": sum(results)}
+
+    def start_health_checks(self, interval: float = 60.0, concurrency: int = 20) -> Task:
+        """
+        Starts re-probing the pool every ``interval`` seconds in the background
+        """
+        self.stop_health_checks()
+
+        async def loop():
+            while True:
+                await self.health_check(concurrency)
+                await sleep(interval)
+
+        self._health_task = create_task(loop())
+        return self._health_task
+
+    def stop_health_checks(self):
+        if self._health_task is not None:
+            self._health_task.cancel()
+            self._health_task = None
+
+    def stats(self) -> dict:
+        states = [proxy.breaker.state for proxy in self._by_url.values()]
+        latencies = [proxy.ewma_latency for proxy in self._by_url.values() if proxy.ewma_latency is not None]
+        return {
+            "total": len(states),
+            "available": states.count(CircuitBreaker.CLOSED) + states.count(CircuitBreaker.HALF_OPEN),
+            "open": states.count(CircuitBreaker.OPEN),
+            "half_open": states.count(CircuitBreaker.HALF_OPEN),
+            "avg_latency": sum(latencies) / len(latencies) if latencies else None,
+            "avg_failure_rate": sum(proxy.failure_rate for proxy in self._by_url.values()) / len(states)
+            if states
+            else 0.0,
+        }
+
+    def get_by_url(self, url: str) -> Proxy | None:
+        return self._by_url.get(url)
@@ -0,0 +1,204 @@
+from asyncio import CancelledError, Event, Future, Task, create_task, get_running_loop, sleep
+from heapq import heappop, heappush
+from itertools import count
+from time import monotonic
+from typing import Dict, List, Tuple
+
+
+class TokenBucket:
+    """
+    Token bucket allowing ``rate`` requests every ``per`` seconds with bursts of up to ``burst`` requests.
+    """
+
+    __slots__ = ("rate", "per", "capacity", "tokens", "updated")
+
+    def __init__(self, rate: int, per: float = 1.0, burst: int = None):
+        self.rate = rate
+        self.per = per
+        self.capacity = burst or rate
+        self.tokens = float(self.capacity)
+        self.updated = monotonic()
+
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate / self.per)
+        self.updated = now
+
+    def delay(self, now: float) -> float:
+        """
+        Seconds left until a token is available
+        """
+        self._refill(now)
+        return 0.0 if self.tokens >= 1 else (1 - self.tokens) * self.per / self.rate
+
+    def take(self):
+        self.tokens -= 1
+
+    def __repr__(self):
+        return f"TokenBucket({self.rate}/{self.per}s)"
+
+
+class _Lane:
+    __slots__ = (
+        "buckets",
+        "concurrency",
+        "active",
+        "queue",
+        "released",
+        "dispatcher",
+        "waiting",
+        "acquired",
+        "total_wait",
+        "max_wait",
+    )
+
+    def __init__(self, buckets: List[TokenBucket], concurrency: int = None):
+        self.buckets = buckets
+        self.concurrency = concurrency
+        self.active = 0
+        self.queue: List[Tuple[float, int, Future]] = []
+        self.released = Event()
+        self.dispatcher: Task | None = None
+        self.waiting = 0
+        self.acquired = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    @property
+    def full(self) -> bool:
+        return bool(self.concurrency) and self.active >= self.concurrency
+
+    def delay(self, now: float) -> float:
+        return max((bucket.delay(now) for bucket in self.buckets), default=0.0)
+
+    def grant(self):
+        for bucket in self.buckets:
+            bucket.take()
+        self.active += 1
+
+
+class RateLimiter:
+    """
+    Paces requests per key (usually a host, or a host and proxy pair) before they are sent and optionally
+    caps how many of them run at once. Waiting requests are served by priority, higher first; a waiting
+    request gains ``aging`` priority levels per second so low priority work is never starved.
+
+    Args:
+        limits: Mapping of host to ``(rate, per)`` tuples, e.g. ``{"shikimori.one": [(5, 1), (90, 60)]}``
+        concurrency: Mapping of host to the maximum number of requests in flight
+        aging: Priority levels a waiting request gains per second, 0 for strict priorities
+    """
+
+    def __init__(
+        self,
+        limits: Dict[str, List[Tuple[int, float]]] = None,
+        concurrency: Dict[str, int] = None,
+        aging: float = 1.0,
+    ):
+        self.limits: Dict[str, List[Tuple[int, float]]] = {}
+        self.concurrency: Dict[str, int] = dict(concurrency or {})
+        self.aging = aging
+        self._lanes: Dict[str, _Lane] = {}
+        self._order = count()
+        for host, host_limits in (limits or {}).items():
+            self.configure(host, *host_limits)
+
+    def configure(self, host: str, *limits: Tuple[int, float], concurrency: int = None):
+        """
+        Sets the limits of a host, replacing previous ones. Calling without limits removes pacing for the host.
+        """
+        self.limits[host] = list(limits)
+        if concurrency is not None:
+            self.concurrency[host] = concurrency
+        for key, lane in self._lanes.items():
+            if key.split("|", 1)[0] == host:
+                lane.buckets = [TokenBucket(*limit) for limit in limits]
+                lane.concurrency = self.concurrency.get(host)
+                lane.released.set()
+
+    def _lane(self, key: str) -> _Lane | None:
+        lane = self._lanes.get(key)
+        if lane is None:
+            host = key.split("|", 1)[0]
+            limits, concurrency = self.limits.get(host), self.concurrency.get(host)
+            if not limits and not concurrency:
+                return None
+            lane = self._lanes[key] = _Lane([TokenBucket(*limit) for limit in limits or ()], concurrency)
+        return lane
+
+    async def _dispatch(self, lane: _Lane):
+        try:
+            while lane.queue:
+                if lane.queue[0][2].done():
+                    heappop(lane.queue)
+                elif lane.full:
+                    lane.released.clear()
+                    await lane.released.wait()
+                elif (delay := lane.delay(monotonic())) > 0:
+                    await sleep(delay)
+                else:
+                    lane.grant()
+                    heappop(lane.queue)[2].set_result(None)
+        finally:
+            lane.dispatcher = None
+
+    async def acquire(self, host: str, proxy: str = None, priority: int = 0) -> float:
+        """
+        Waits until a request to ``host`` (through ``proxy`` if limits are tracked per proxy) may be sent.
+        Hosts with a concurrency limit must call :meth:`release` once the request is done.
+
+        Returns:
+            float: Seconds spent waiting
+        """
+        lane = self._lane(f"{host}|{proxy}" if proxy else host)
+        if lane is None:
+            return 0.0
+        start = monotonic()
+        if not lane.queue and not lane.full and lane.delay(start) <= 0:
+            lane.grant()
+        else:
+            loop = get_running_loop()
+            future = loop.create_future()
+            # with linear aging the order of two waiters never changes, so a static heap key is enough
+            heappush(lane.queue, (self.aging * start - priority, next(self._order), future))
+            if lane.dispatcher is None or lane.dispatcher.get_loop() is not loop:
+                lane.dispatcher = create_task(self._dispatch(lane))
+            lane.waiting += 1
+            try:
+                await future
+            except CancelledError:
+                if future.done() and not future.cancelled():
+                    self._release(lane)
+                raise
+            finally:
+                lane.waiting -= 1
+        waited = monotonic() - start
+        lane.acquired += 1
+        lane.total_wait += waited
+        lane.max_wait = max(lane.max_wait, waited)
+        return waited
+
+    @staticmethod
+    def _release(lane: _Lane):
+        lane.active = max(0, lane.active - 1)
+        lane.released.set()
+
+    def release(self, host: str, proxy: str = None):
+        """
+        Frees the concurrency slot taken by :meth:`acquire`
+        """
+        lane = self._lanes.get(f"{host}|{proxy}" if proxy else host)
+        if lane is not None:
+            self._release(lane)
+
+    def stats(self) -> Dict[str, dict]:
+        return {
+            key: {
+                "waiting": lane.waiting,
+                "active": lane.active,
+                "acquired": lane.acquired,
+                "total_wait": lane.total_wait,
+                "max_wait": lane.max_wait,
+                "avg_wait": lane.total_wait / lane.acquired if lane.acquired else 0.0,
+            }
+            for key, lane in self._lanes.items()
+        }
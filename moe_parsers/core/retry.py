@@ -0,0 +1,130 @@
+from aiohttp import ClientConnectionError, ClientPayloadError
+from collections import deque
+from random import uniform
+from time import monotonic
+from typing import Dict, Iterable, Tuple, Type
+
+
+class RetryBudget:
+    """
+    Limits retries to a fraction of the requests made in a sliding window, so an upstream outage does not
+    multiply the load sent to it.
+
+    Args:
+        ratio: Retries allowed per request made in the window
+        min_per_second: Retries always allowed per second, regardless of traffic
+        window: Length of the sliding window in seconds
+    """
+
+    def __init__(self, ratio: float = 0.2, min_per_second: float = 1.0, window: float = 10.0):
+        self.ratio = ratio
+        self.min_per_second = min_per_second
+        self.window = window
+        # requests are counted per second, so memory stays bounded by the window length at any traffic
+        self._requests: deque[list] = deque()
+        self._request_count = 0
+        self._retries = deque()
+
+    def _trim(self, now: float):
+        while self._requests and self._requests[0][0] + 1 <= now - self.window:
+            self._request_count -= self._requests.popleft()[1]
+        while self._retries and self._retries[0] <= now - self.window:
+            self._retries.popleft()
+
+    def record_request(self):
+        now = monotonic()
+        if self._requests and self._requests[-1][0] == int(now):
+            self._requests[-1][1] += 1
+        else:
+            self._trim(now)
+            self._requests.append([int(now), 1])
+        self._request_count += 1
+
+    def try_retry(self) -> bool:
+        """
+        Withdraws a retry from the budget, returns False if the budget is exhausted
+        """
+        now = monotonic()
+        self._trim(now)
+        if len(self._retries) >= max(self.min_per_second * self.window, self.ratio * self._request_count):
+            return False
+        self._retries.append(now)
+        return True
+
+
+class RetryPolicy:
+    """
+    Decides whether and when a failed request is retried: exponential backoff with full jitter, per status
+    and per exception rules, a shared :class:`RetryBudget` and an optional deadline.
+
+    Args:
+        max_retries: Maximum number of retries of a single request
+        backoff: Base delay in seconds, the n-th retry waits a random time in ``[0, backoff * 2 ** n]``
+        max_backoff: Upper bound of a single delay in seconds
+        statuses: Response statuses that are retried
+        exceptions: Exception types that are retried
+        limits: Maximum retries per status code or exception type, overriding ``max_retries``
+        respect_retry_after: Wait for the ``Retry-After`` header value when the response has one
+        budget: Retry budget shared by every request using the policy, None to disable
+    """
+
+    def __init__(
+        self,
+        max_retries: int = 5,
+        backoff: float = 0.1,
+        max_backoff: float = 10.0,
+        statuses: Iterable[int] = (429, *range(500, 600)),
+        exceptions: Tuple[Type[BaseException], ...] = (TimeoutError, ClientConnectionError, ClientPayloadError),
+        limits: Dict[int | Type[BaseException], int] = None,
+        respect_retry_after: bool = True,
+        budget: RetryBudget | None = None,
+    ):
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.statuses = frozenset(statuses)
+        self.exceptions = exceptions
+        self.limits = limits or {}
+        self.respect_retry_after = respect_retry_after
+        self.budget = budget if budget is not None else RetryBudget()
+
+    def retries_status(self, status: int) -> bool:
+        return status in self.statuses
+
+    def retries_exception(self, exc: BaseException) -> bool:
+        return isinstance(exc, self.exceptions)
+
+    def _limit(self, reason: int | BaseException, max_retries: int = None) -> int:
+        if isinstance(reason, BaseException):
+            for exc_type, limit in self.limits.items():
+                if isinstance(exc_type, type) and isinstance(reason, exc_type):
+                    return limit
+        elif reason in self.limits:
+            return self.limits[reason]
+        return self.max_retries if max_retries is None else max_retries
+
+    def delay(
+        self,
+        attempt: int,
+        reason: int | BaseException,
+        retry_after: str | None = None,
+        deadline: float | None = None,
+        max_retries: int = None,
+    ) -> float | None:
+        """
+        Returns how long to wait before retry number ``attempt + 1`` caused by ``reason`` (a status code or an
+        exception), or None if the request must not be retried.
+        """
+        if attempt >= self._limit(reason, max_retries):
+            return None
+        delay = uniform(0, min(self.max_backoff, self.backoff * 2**attempt))
+        if retry_after is not None and self.respect_retry_after:
+            try:
+                delay = max(delay, float(retry_after))
+            except ValueError:
+                pass
+        if deadline is not None and monotonic() + delay >= deadline:
+            return None
+        if self.budget is not None and not self.budget.try_retry():
+            return None
+        return delay
@@ -0,0 +1,121 @@
+from collections import OrderedDict
+from sqlite3 import connect, Connection
+from threading import RLock
+from typing import Iterable, List, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from cutlet import Cutlet
+
+_katsu: "Cutlet | None" = None
+
+
+def get_katsu() -> "Cutlet":
+    """
+    Returns the shared Cutlet instance, the unidic dictionary is loaded on the first call
+    """
+    global _katsu
+    if _katsu is None:
+        from cutlet import Cutlet
+
+        _katsu = Cutlet()
+    return _katsu
+
+
+class Romanizer:
+    """
+    Memoized romanization of Japanese text. Results are kept in a bounded LRU and, when ``path`` is given,
+    in an SQLite dictionary shared between runs and processes.
+
+    Args:
+        max_size: Maximum number of results kept in memory
+        path: Path of the persistent dictionary, None to keep results in memory only
+    """
+
+    def __init__(self, max_size: int = 65536, path: str = None):
+        self.max_size = max_size
+        self.path = str(path) if path else None
+        self.hits = 0
+        self.misses = 0
+        self._memo: OrderedDict[str, str] = OrderedDict()
+        self._connection: Connection | None = None
+        self._lock = RLock()
+
+    def _connect(self) -> Connection | None:
+        if self._connection is None and self.path:
+            self._connection = connect(self.path, timeout=30, check_same_thread=False, isolation_level=None)
+            self._connection.execute("PRAGMA journal_mode=WAL")
+            self._connection.execute("CREATE TABLE IF NOT EXISTS romaji (text TEXT PRIMARY KEY, romaji TEXT NOT NULL)")
+        return self._connection
+
+    def _remember(self, text: str, romaji: str):
+        self._memo[text] = romaji
+        self._memo.move_to_end(text)
+        if len(self._memo) > self.max_size:
+            self._memo.popitem(last=False)
+
+    def romaji(self, text: str) -> str:
+        """
+        Returns the romanization of ``text``
+        """
+        if not text:
+            return ""
+        with self._lock:
+            if text in self._memo:
+                self.hits += 1
+                self._memo.move_to_end(text)
+                return self._memo[text]
+            return self.batch([text])[0]
+
+    def batch(self, texts: Iterable[str]) -> List[str]:
+        """
+        Romanizes many strings at once, strings missing from memory are looked up in the persistent
+        dictionary with a single query and the new results are stored with a single transaction.
+        """
+        texts = list(texts)
+        with self._lock:
+            found = {}
+            for text in dict.fromkeys(texts):
+                if text in self._memo:
+                    self._memo.move_to_end(text)
+                    found[text] = self._memo[text]
+            missing = [text for text in dict.fromkeys(texts) if text and text not in found]
+            connection = self._connect()
+            if missing and connection is not None:
+                for offset in range(0, len(missing), 500):
+                    chunk = missing[offset : offset + 500]
+                    query = f"SELECT text, romaji FROM romaji WHERE text IN ({', '.join('?' * len(chunk))})"
+                    found.update(connection.execute(query, chunk))
+                missing = [text for text in missing if text not in found]
+            computed = [(text, get_katsu().romaji(text)) for text in missing]
+            found.update(computed)
+            for text in dict.fromkeys(texts):
+                if text:
+                    self._remember(text, found[text])
+            if computed and connection is not None:
+                with connection:
+                    connection.execute("BEGIN")
+                    connection.executemany("INSERT OR REPLACE INTO romaji (text, romaji) VALUES (?, ?)", computed)
+            self.misses += len(missing)
+            self.hits += len(texts) - len(missing)
+            return [found[text] if text else "" for text in texts]
+
+    def __reduce__(self):
+        # worker processes use their own shared instance instead of a fresh copy per call
+        if self is default_romanizer:
+            return "default_romanizer"
+        return Romanizer, (self.max_size, self.path)
+
+    def close(self):
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
+
+    def stats(self) -> dict:
+        return {"entries": len(self._memo), "max_size": self.max_size, "hits": self.hits, "misses": self.misses}
+
+
+default_romanizer = Romanizer()
+
+
+def romanize(text: str) -> str:
+    return default_romanizer.romaji(text)
@@ -1,12 +1,28 @@
 from ..core.parser import Parser
 from ..core.items import _BaseItem, Anime, Manga, Character, Person, Translation
 from typing import Unpack, AsyncGenerator, List
+from asyncio import create_task
 from datetime import datetime
-from cutlet import Cutlet
 from difflib import SequenceMatcher
-
-
-katsu = Cutlet()
+from json import loads
+from functools import cache
+from ..core.html import parse_html, region_filter
+from ..core.romaji import Romanizer, default_romanizer
+
+
+@cache
+def _info_regions():
+    return region_filter(
+        ("script", {"type": "application/ld+json"}),
+        ("meta", {"property": "og:image"}),
+        ("div", {"class": "anime-title"}),
+        ("dl", {}),
+        ("span", {"class": "rating-value"}),
+        ("div", {"class": "rating-count"}),
+        ("div", {"class": "description"}),
+        ("div", {"class": "video-block"}),
+        ("div", {"class": "screenshots-block"}),
+    )
 
 
 class Animego(Parser):
@@ -41,7 +57,7 @@ class Animego(Parser):
 
     async def search_generator(self, query: str) -> AsyncGenerator[_BaseItem, None]:
         response = await self.client.get("search/all", params={"q": query})
-        page = self.client.soup(response.text)  # yummy!
+        page = response.soup  # yummy!
         items = page.find_all("div", {"class": "animes-grid-item"})
         for item in items:
             try:
@@ -85,16 +101,86 @@ class Animego(Parser):
             except AttributeError:
                 continue
 
-    async def get_info(self, url: str) -> dict:
+    async def get_info(self, url: str, episodes: bool = True, translations: bool = False) -> dict:
+        """
+        Fetches the page of an anime together with its episode schedule and translations, the sub-resources
+        are requested concurrently with the page.
+
+        Args:
+            url: Url of the anime page
+            episodes: Fetch the episode schedule
+            translations: Fetch the available translations
+        """
+        fetches = {}
+        if episodes:
+            fetches["episodes"] = create_task(self.get_episodes(url))
+        if translations:
+            fetches["translations"] = create_task(self.get_translations(url[url.rfind("-") + 1 :]))
+        try:
+            response = await self.client.get(url)
+            anime_data = await self.run_cpu(
+                self.parse_info,
+                response.data,
+                url,
+                self.client._my("html_parser", "auto"),
+                encoding=response.encoding,
+                romanizer=self.romanizer if self.romanize else None,
+            )
+            for key, task in fetches.items():
+                anime_data[key] = await task
+        finally:
+            for task in fetches.values():
+                if task.done() and not task.cancelled():
+                    task.exception()
+                task.cancel()
+
+        if episodes and not anime_data["episodes"] and anime_data.get("type") in [Anime.Type.MOVIE]:
+            anime_data["episodes"] = [
+                Anime.Episode(
+                    number="1",
+                    title=anime_data["title"],
+                    aired=anime_data["completed"],
+                    status=Anime.Episode.EpisodeStatus.RELEASED,
+                )
+            ]
+
+        anime = Anime(**anime_data)
+        anime.get_id("animego")
+
+        return anime_data
+
+    @classmethod
+    def parse_info(
+        cls,
+        markup: str | bytes,
+        url: str,
+        html_parser: str = "auto",
+        partial: bool = True,
+        romanizer: Romanizer | None = default_romanizer,
+        encoding: str = None,
+    ) -> dict:
+        """
+        Extracts the information of an anime from its page, everything except the episodes. With ``partial``
+        only the regions holding the information are parsed. Raw bytes are decoded with ``encoding``. Without
+        a ``romanizer`` no title is recognized as romaji.
+        """
+        if isinstance(markup, bytes):
+            markup = markup.decode(encoding or "utf-8", "replace")
         anime_data = {}
-        response = await self.client.get(url)
-        soup = self.client.soup(response.text)
+        soup = parse_html(markup, html_parser, parse_only=_info_regions() if partial else None)
+        fields = {dt.get_text(strip=True): dt.find_next_sibling("dd") for dt in soup.find_all("dt")}
         anime_data["url"] = url
 
         script_block = soup.find("script", type="application/ld+json")
-        anime_data["ld_json"] = self.client.json(script_block.text) if script_block else None
+        anime_data["ld_json"] = loads(script_block.text) if script_block else None
 
         anime_data["animego_id"] = int(url[url.rfind("-") + 1 :])
+        headlines = anime_data["ld_json"]["alternativeHeadline"]
+        romanized = [
+            romaji.strip().lower()
+            for headline, romaji in zip(headlines, romanizer.batch(headlines) if romanizer else [])
+            if romaji.strip() != headline.strip()
+        ]
         anime_data["title"] = {
             Anime.Language.RUSSIAN: (soup.find("div", class_="anime-title").find("h1").text.strip()),
             Anime.Language.JAPANESE: [
@@ -112,16 +198,7 @@ class Animego(Parser):
             Anime.Language.ROMAJI: [
                 title
                 for title in anime_data["ld_json"]["alternativeHeadline"]
-                if any(
-                    SequenceMatcher(
-                        None,
-                        title.strip().lower(),
-                        katsu.romaji(romaji).strip().lower(),
-                    ).ratio()
-                    >= 0.75
-                    for romaji in anime_data["ld_json"]["alternativeHeadline"]
-                    if katsu.romaji(romaji).strip() != romaji.strip()
-                )
+                if any(SequenceMatcher(None, title.strip().lower(), romaji).ratio() >= 0.75 for romaji in romanized)
             ],
         }
         anime_data["title"][Anime.Language.ENGLISH] = [
@@ -148,22 +225,22 @@ class Animego(Parser):
 
         # Дата выхода
         if "startDate" in anime_data["ld_json"]:
-            anime_data["started"] = self.string2datetime(anime_data["ld_json"]["startDate"], "%Y-%m-%d")
+            anime_data["started"] = cls.string2datetime(anime_data["ld_json"]["startDate"], "%Y-%m-%d")
             anime_data["completed"] = (
-                self.string2datetime(anime_data["ld_json"]["endDate"], "%Y-%m-%d")
+                cls.string2datetime(anime_data["ld_json"]["endDate"], "%Y-%m-%d")
                 if "endDate" in anime_data["ld_json"]
                 else None
             )
         elif "createdAt" in anime_data["ld_json"]:
-            anime_data["started"] = self.string2datetime(anime_data["ld_json"]["createdAt"], "%Y-%m-%d")
+            anime_data["started"] = cls.string2datetime(anime_data["ld_json"]["createdAt"], "%Y-%m-%d")
             anime_data["completed"] = anime_data["started"]
         else:
             anime_data["started"], anime_data["completed"] = None, None
 
         # Длительность
-        duration_block = soup.find("dt", string="Длительность")
+        duration_block = fields.get("Длительность")
         if duration_block:
-            duration_string = duration_block.find_next_sibling("dd").text.strip()
+            duration_string = duration_block.text.strip()
             try:
                 if " ч. " in duration_string:
                     hours, minutes = duration_string.split(" ч. ")
@@ -179,22 +256,22 @@ class Animego(Parser):
                 anime_data["episode_duration"] = None
 
         # Студия
-        studio_block = soup.find("dt", string="Студия")
+        studio_block = fields.get("Студия")
         if studio_block:
-            anime_data["studio"] = studio_block.find_next_sibling("dd").text.strip()
+            anime_data["studio"] = studio_block.text.strip()
 
         # MPAA рейтинг
-        mpaa_block = soup.find("dt", string="Рейтинг MPAA")
+        mpaa_block = fields.get("Рейтинг MPAA")
         if mpaa_block:
-            anime_data["mpaa"] = mpaa_block.find_next_sibling("dd").text.strip()
+            anime_data["mpaa"] = mpaa_block.text.strip()
 
         # Возрастной рейтинг
         anime_data["age_rating"] = anime_data["ld_json"].get("contentRating", None)
 
         # Озвучка
-        dubbing_block = soup.find("dt", string="Озвучка")
+        dubbing_block = fields.get("Озвучка")
         if dubbing_block:
-            dubbing_list = dubbing_block.find_next_sibling("dd").find_all("a")
+            dubbing_list = dubbing_block.find_all("a")
             anime_data["dubbing"] = [dubbing.text.strip() for dubbing in dubbing_list]
 
         # Главные герои
@@ -229,9 +306,9 @@ class Animego(Parser):
         screenshots = soup.select("div.screenshots-block a img")
         anime_data["screenshots"] = [img["src"] for img in screenshots]
 
-        type_block = soup.find("dt", string="Тип")
+        type_block = fields.get("Тип")
         if type_block:
-            _type = type_block.find_next_sibling("dd").text.strip()
+            _type = type_block.text.strip()
             anime_data["type"] = (
                 Anime.Type.MOVIE
                 if _type == "Фильм"
@@ -256,29 +333,24 @@ class Animego(Parser):
                 "url": person.get("url", None),
             }
 
-        anime_data["episodes"] = await self.get_episodes(url)
-        if not anime_data["episodes"] and anime_data["type"] in [Anime.Type.MOVIE]:
-            anime_data["episodes"] = [
-                Anime.Episode(
-                    number="1",
-                    title=anime_data["title"],
-                    aired=anime_data["completed"],
-                    status=Anime.Episode.EpisodeStatus.RELEASED,
-                )
-            ]
-
         anime_data["ids"] = {
             Anime.IDType.ANIMEGO: anime_data["animego_id"],
         }
-        anime = Anime(**anime_data)
-        anime.get_id("animego")
-
         return anime_data
 
     async def get_episodes(self, url: str) -> List[Anime.Episode]:
         params = {"type": "episodeSchedule", "episodeNumber": "9999"}
         response = await self.client.get(url, params=params)
-        soup = self.client.soup(response.json.get("content"))
+        return await self.run_cpu(
+            self.parse_episodes, response.json.get("content"), self.client._my("html_parser", "auto")
+        )
+
+    @classmethod
+    def parse_episodes(cls, markup: str, html_parser: str = "auto") -> List[Anime.Episode]:
+        """
+        Extracts the episodes from the episode schedule returned by :meth:`get_episodes`
+        """
+        soup = parse_html(markup, html_parser)
         episodes_list = []
         for ep in soup.find_all("div", {"class": ["row", "m-0"]}):
             items = ep.find_all("div")
@@ -306,7 +378,7 @@ class Animego(Parser):
         for i, ep in enumerate(episodes):
             try:
                 if ep.aired:
-                    episodes[i].aired = self.string2datetime(episodes[i].aired)
+                    episodes[i].aired = cls.string2datetime(episodes[i].aired)
             except ValueError:
                 episodes[i].aired = None
         return episodes
@@ -321,6 +393,7 @@ class Animego(Parser):
             reason = reason_elem.text if reason_elem else None
             print(reason)
 
+        translations = []
         try:
             translations_elem = soup.find("div", {"id": "video-dubbing"}).find_all(
                 "span", {"class": "video-player-toggle-item"}
@@ -331,7 +404,6 @@ class Animego(Parser):
                 name = translation.text.strip()
                 dubs[dubbing] = name
 
-            translations = []
             added = []
             players_elem = soup.find("div", {"id": "video-players"}).find_all(
                 "span", {"class": "video-player-toggle-item"}
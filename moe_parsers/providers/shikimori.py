@@ -1,12 +1,39 @@
-from ..core.parser import Parser
-from ..core.items import _BaseItem, Anime, Character, Person, Manga
-from typing import Literal, TypedDict, Unpack, AsyncGenerator, List
+from ..core.parser import Parser, BatchResult
+from ..core.items import _BaseItem, Anime, Character, Person, Manga, LazyDict
+from typing import Literal, TypedDict, Unpack, AsyncGenerator, List, Iterable, Callable, Any
+from functools import partial
+from itertools import islice
+from json import loads
 from datetime import datetime
-from cutlet import Cutlet
-from difflib import SequenceMatcher
+from ..core.romaji import Romanizer, default_romanizer
+from ..core.matching import TitleIndex
 
 
-katsu = Cutlet()
+def _romaji(texts: List[str], romanizer: Romanizer, exclude: List[str] = None) -> List[str]:
+    """
+    Romanized ``texts`` without duplicates. With ``exclude`` (English titles) unreadable results and results
+    equal to one of the excluded titles are dropped.
+    """
+    result = []
+    for text in texts:
+        rom = romanizer.romaji(text).title()
+        if rom in result:
+            continue
+        if exclude is not None and (rom in exclude or not rom or len(rom.strip()) // 2 <= rom.count("?")):
+            continue
+        result.append(rom)
+    return result
+
+
+def _with_romaji(names: LazyDict, romanizer: Romanizer | None, exclude: List[str] = None) -> LazyDict:
+    """
+    Defers the romaji names until they are read, or leaves them empty when romanization is disabled
+    """
+    if romanizer is None:
+        names[_BaseItem.Language.ROMAJI] = []
+    else:
+        names.defer(_BaseItem.Language.ROMAJI, partial(_romaji, names[_BaseItem.Language.JAPANESE], romanizer, exclude))
+    return names
 
 
 class Shikimori(Parser):
@@ -21,6 +48,9 @@ class Shikimori(Parser):
             }
         )
         self.client.base_url = "https://shikimori.one/"
+        limiter = self.client.get_rate_limiter()
+        if "shikimori.one" not in limiter.limits:
+            limiter.configure("shikimori.one", (5, 1), (90, 60))
 
     graphql_query = {
         "mangas": "{mangas({params}) {id malId name russian licenseNameRu english japanese synonyms kind score status volumes chapters airedOn {date} releasedOn {date} url poster {id originalUrl mainUrl} licensors createdAt updatedAt isCensored genres {id name russian kind} publishers {id name} externalLinks {id kind url createdAt updatedAt} personRoles {id rolesRu rolesEn person {id malId name russian japanese synonyms url isSeyu isMangaka isProducer website createdAt updatedAt birthOn {date} deceasedOn {date} poster {id originalUrl mainUrl previewUrl}}} characterRoles {id rolesRu rolesEn character {id malId name russian japanese synonyms description url createdAt updatedAt isAnime isManga isRanobe poster {id originalUrl mainUrl previewUrl} description descriptionHtml descriptionSource}} related {id anime {id name} manga {id name} relationKind relationText} scoresStats {score count} statusesStats {status count} description descriptionHtml descriptionSource}}",
@@ -31,7 +61,7 @@ class Shikimori(Parser):
     }
 
     @classmethod
-    def data2anime(cls, data) -> Anime:
+    def data2anime(cls, data, romanizer: Romanizer | None = default_romanizer) -> Anime:
         anime = Anime()
         anime.data = data
         anime.ids = {
@@ -39,18 +69,18 @@ class Shikimori(Parser):
             _BaseItem.IDType.SHIKIMORI: data.get("id"),
         }
         anime.age_rating = data.get("rating", "unknown") if str(data.get("rating")).lower() != "none" else "unknown"
-        anime.title = {
-            _BaseItem.Language.RUSSIAN: [data.get("russian", "")],
-            _BaseItem.Language.ENGLISH: [data.get("english", "")],
-            _BaseItem.Language.JAPANESE: [data.get("japanese", "")],
-            _BaseItem.Language.ROMAJI: [],
-        }
-        for title in anime.title[_BaseItem.Language.JAPANESE]:
-            rom = katsu.romaji(title).title()
-            if rom in anime.title[_BaseItem.Language.ENGLISH]:
-                continue
-            if rom and len(rom.strip()) // 2 > rom.count("?") and rom not in anime.title[_BaseItem.Language.ROMAJI]:
-                anime.title[_BaseItem.Language.ROMAJI].append(rom)
+        english = [data.get("english", "")]
+        anime.title = _with_romaji(
+            LazyDict(
+                {
+                    _BaseItem.Language.RUSSIAN: [data.get("russian", "")],
+                    _BaseItem.Language.ENGLISH: english,
+                    _BaseItem.Language.JAPANESE: [data.get("japanese", "")],
+                }
+            ),
+            romanizer,
+            exclude=english,
+        )
         anime.thumbnail = data.get("poster", {}).get("mainUrl")
         anime.type = data.get("kind", "unknown")
         anime.status = data.get("status", "unknown").replace("anons", "announced")
@@ -68,24 +98,34 @@ class Shikimori(Parser):
         anime.studios = [studio["name"] for studio in data.get("studios", [])]
         anime.genres = {genre["kind"]: genre["name"] for genre in data.get("genres", [])}
         anime.directors = [
-            cls.data2person(p["person"]) for p in data.get("personRoles", []) if "Director" in p.get("rolesEn", [])
+            cls.data2person(p["person"], romanizer)
+            for p in data.get("personRoles", [])
+            if "Director" in p.get("rolesEn", [])
         ]
         anime.producers = [
-            cls.data2person(p["person"]) for p in data.get("personRoles", []) if "Producer" in p.get("rolesEn", [])
+            cls.data2person(p["person"], romanizer)
+            for p in data.get("personRoles", [])
+            if "Producer" in p.get("rolesEn", [])
         ]
         anime.actors = [
-            cls.data2person(p["person"]) for p in data.get("personRoles", []) if "Voice Actor" in p.get("rolesEn", [])
+            cls.data2person(p["person"], romanizer)
+            for p in data.get("personRoles", [])
+            if "Voice Actor" in p.get("rolesEn", [])
         ]
         anime.writers = [
-            cls.data2person(p["person"]) for p in data.get("personRoles", []) if "Script" in p.get("rolesEn", [])
+            cls.data2person(p["person"], romanizer)
+            for p in data.get("personRoles", [])
+            if "Script" in p.get("rolesEn", [])
         ]
         anime.composers = [
-            cls.data2person(p["person"]) for p in data.get("personRoles", []) if "Music" in p.get("rolesEn", [])
+            cls.data2person(p["person"], romanizer)
+            for p in data.get("personRoles", [])
+            if "Music" in p.get("rolesEn", [])
         ]
         anime.characters = [
             Character(
                 type=Character.Type(character.get("rolesEn", ["unknown"])[0].lower()),
-                **cls.data2character(character.get("character", {})).__dict__,
+                **cls.data2character(character.get("character", {}), romanizer).__dict__,
             )
             for character in data.get("characterRoles", [])
         ]
@@ -99,7 +139,7 @@ class Shikimori(Parser):
         return anime
 
     @classmethod
-    def data2manga(cls, data) -> Manga:
+    def data2manga(cls, data, romanizer: Romanizer | None = default_romanizer) -> Manga:
         manga = Manga()
         manga.data = data
         manga.ids = {
@@ -107,22 +147,17 @@ class Shikimori(Parser):
             _BaseItem.IDType.SHIKIMORI: data.get("id"),
         }
         manga.age_rating = data.get("rating", "unknown") if str(data.get("rating")).lower() != "none" else "unknown"
-        manga.title = {
-            _BaseItem.Language.RUSSIAN: [data.get("russian", "")],
-            _BaseItem.Language.ENGLISH: [data.get("english", "")],
-            _BaseItem.Language.JAPANESE: [data.get("japanese", "")],
-            _BaseItem.Language.ROMAJI: [],
-        }
-        for title in manga.title[_BaseItem.Language.JAPANESE]:
-            if katsu.romaji(title).title() not in manga.title[_BaseItem.Language.ROMAJI]:
-                manga.title[_BaseItem.Language.ROMAJI].append(katsu.romaji(title).title())
+        manga.title = _with_romaji(
+            LazyDict(
+                {
+                    _BaseItem.Language.RUSSIAN: [data.get("russian", "")],
+                    _BaseItem.Language.ENGLISH: [data.get("english", "")],
+                    _BaseItem.Language.JAPANESE: [data.get("japanese", "")],
+                }
+            ),
+            romanizer,
+        )
         manga.status = data.get("status", "unknown").replace("anons", "announced")
-        for title in manga.title[_BaseItem.Language.JAPANESE]:
-            rom = katsu.romaji(title).title()
-            if rom in manga.title[_BaseItem.Language.ENGLISH]:
-                continue
-            if rom and len(rom.strip()) // 2 > rom.count("?") and rom not in manga.title[_BaseItem.Language.ROMAJI]:
-                manga.title[_BaseItem.Language.ROMAJI].append(rom)
         manga.thumbnail = data.get("poster", {}).get("mainUrl")
         manga.type = data.get("kind", "unknown")
         manga.status = data.get("status", "unknown")
@@ -143,7 +178,7 @@ class Shikimori(Parser):
         manga.characters = [
             Character(
                 type=Character.Type(character.get("rolesEn", ["unknown"])[0].lower()),
-                **cls.data2character(character.get("character", {})).__dict__,
+                **cls.data2character(character.get("character", {}), romanizer).__dict__,
             )
             for character in data.get("characterRoles", [])
         ]
@@ -154,21 +189,22 @@ class Shikimori(Parser):
         return manga
 
     @classmethod
-    def data2person(cls, data) -> Person:
+    def data2person(cls, data, romanizer: Romanizer | None = default_romanizer) -> Person:
         person = Person()
         person.ids = {
             _BaseItem.IDType.MAL: data.get("malId"),
             _BaseItem.IDType.SHIKIMORI: data.get("id"),
         }
-        person.name = {
-            _BaseItem.Language.RUSSIAN: [data.get("russian", "")],
-            _BaseItem.Language.ENGLISH: [data.get("name", "")],
-            _BaseItem.Language.JAPANESE: [data.get("japanese", "")],
-            _BaseItem.Language.ROMAJI: [],
-        }
-        for name in person.name[_BaseItem.Language.JAPANESE]:
-            if katsu.romaji(name).title() not in person.name[_BaseItem.Language.ROMAJI]:
-                person.name[_BaseItem.Language.ROMAJI].append(katsu.romaji(name).title())
+        person.name = _with_romaji(
+            LazyDict(
+                {
+                    _BaseItem.Language.RUSSIAN: [data.get("russian", "")],
+                    _BaseItem.Language.ENGLISH: [data.get("name", "")],
+                    _BaseItem.Language.JAPANESE: [data.get("japanese", "")],
+                }
+            ),
+            romanizer,
+        )
         person.thumbnail = data.get("poster", {}).get("mainUrl") if data.get("poster") else None
         person.image = data.get("poster", {}).get("mainUrl") if data.get("poster") else None
         person.birthdate = (
@@ -188,21 +224,23 @@ class Shikimori(Parser):
         return person
 
     @classmethod
-    def data2character(cls, data) -> Character:
+    def data2character(cls, data, romanizer: Romanizer | None = default_romanizer) -> Character:
         character = Character()
         character.data = data
         character.ids = {
             _BaseItem.IDType.MAL: data.get("malId"),
             _BaseItem.IDType.SHIKIMORI: data.get("id"),
         }
-        character.name = {
-            _BaseItem.Language.RUSSIAN: [data.get("russian", "")],
-            _BaseItem.Language.ENGLISH: [data.get("name", "")],
-            _BaseItem.Language.JAPANESE: [data.get("japanese", "")],
-            _BaseItem.Language.ROMAJI: [],
-        }
-        for name in character.name[_BaseItem.Language.JAPANESE]:
-            character.name[_BaseItem.Language.ROMAJI].append(katsu.romaji(name).title())
+        character.name = _with_romaji(
+            LazyDict(
+                {
+                    _BaseItem.Language.RUSSIAN: [data.get("russian", "")],
+                    _BaseItem.Language.ENGLISH: [data.get("name", "")],
+                    _BaseItem.Language.JAPANESE: [data.get("japanese", "")],
+                }
+            ),
+            romanizer,
+        )
         character.thumbnail = data.get("poster", {}).get("previewUrl", None) if data.get("poster") else None
         character.description = {
             _BaseItem.Language.RUSSIAN: data.get("description", ""),
@@ -251,36 +289,38 @@ class Shikimori(Parser):
                             ),
                         },
                     )
-                    for result_type, results in response.json.get("data", {}).items():
-                        for result in results:
-                            yield {
-                                "animes": self.data2anime,
-                                "mangas": self.data2manga,
-                                "characters": self.data2character,
-                                "people": self.data2person,
-                            }[result_type](result)
+                    for item in await self.run_cpu(
+                        self.parse_results, response.data, self.romanizer if self.romanize else None
+                    ):
+                        yield item
+
+    @classmethod
+    def parse_results(
+        cls, data: bytes | dict, romanizer: Romanizer | None = default_romanizer
+    ) -> List[Anime | Manga | Character | Person]:
+        """
+        Converts a GraphQL response, raw or decoded, into items
+        """
+        if isinstance(data, (bytes, str)):
+            data = loads(data)
+        converters = {
+            "animes": cls.data2anime,
+            "mangas": cls.data2manga,
+            "characters": cls.data2character,
+            "people": cls.data2person,
+        }
+        return [
+            converters[result_type](result, romanizer)
+            for result_type, results in (data.get("data") or {}).items()
+            for result in results
+        ]
 
     async def search(
         self, sort_by_match: bool = False, **kwargs: Unpack["SearchArguments"]
     ) -> List[Anime | Manga | Character | Person]:
         results = [item async for item in self.search_generator(**kwargs)]
-        if kwargs.get("searchType", "animes") == "autocomplete" and kwargs.get("search", None):
-            if results:
-                search_query = kwargs.get("search", None)
-                if search_query and sort_by_match:
-                    results.sort(
-                        key=lambda item: SequenceMatcher(
-                            None,
-                            search_query.lower(),
-                            (
-                                item.title.get(_BaseItem.Language.ROMAJI, [None])[0]
-                                or item.title.get(_BaseItem.Language.ENGLISH, [None])[0]
-                                or item.name.get(_BaseItem.Language.ROMAJI, [None])[0]
-                                or item.name.get(_BaseItem.Language.ENGLISH, [None])[0]
-                            ).lower(),
-                        ).ratio(),
-                        reverse=True,
-                    )
+        if sort_by_match and kwargs.get("search", None) and len(results) > 1:
+            results = TitleIndex(results).rank(kwargs["search"])
         return results[0] if len(results) == 1 else results
 
     async def autocomplete_generator(
@@ -326,6 +366,52 @@ class Shikimori(Parser):
                 item.__dict__ == results[0].__dict__
         return results[0] if len(results) == 1 else results
 
+    async def gather_info(
+        self,
+        ids: Iterable[int | str],
+        concurrency: int = 4,
+        ordered: bool = False,
+        progress: Callable[[int, int | None, int], Any] = None,
+        *,
+        item_type: Literal["animes", "mangas", "characters", "people"] = "animes",
+        chunk_size: int = 50,
+    ) -> AsyncGenerator[BatchResult, None]:
+        """
+        Fetches many items of the same type, ``chunk_size`` ids per GraphQL request, and yields a
+        :class:`BatchResult` per id. Ids missing from the response fail with a LookupError.
+
+        Args:
+            ids: Shikimori ids
+            concurrency: Maximum number of concurrent requests
+            ordered: Yield results in the input order instead of as they complete
+            progress: Called with ``(done, total, failed)`` after each id
+            item_type: Type of the items
+            chunk_size: Ids per request, Shikimori returns at most 50 items per page
+        """
+        total = len(ids) if hasattr(ids, "__len__") else None
+        pending = iter(ids)
+        chunks = iter(lambda: [str(item_id) for item_id in islice(pending, chunk_size)], [])
+
+        async def fetch(chunk: List[str]) -> dict:
+            items = self.search_generator(ids=",".join(chunk), searchType=item_type, limit=len(chunk))
+            return {str(item.ids.get(_BaseItem.IDType.SHIKIMORI)): item async for item in items}
+
+        done, failed = 0, 0
+        async for batch in self.map_ids(fetch, chunks, concurrency, ordered):
+            for offset, item_id in enumerate(batch.key):
+                if not batch.ok:
+                    result = BatchResult(batch.index * chunk_size + offset, item_id, error=batch.error)
+                elif item_id in batch.result:
+                    result = BatchResult(batch.index * chunk_size + offset, item_id, batch.result[item_id])
+                else:
+                    error = LookupError(f"{item_type} {item_id} not found")
+                    result = BatchResult(batch.index * chunk_size + offset, item_id, error=error)
+                done += 1
+                failed += not result.ok
+                if progress is not None:
+                    progress(done, total, failed)
+                yield result
+
     class SearchArguments(TypedDict, total=False):
         searchType: (
             List[Literal["animes", "mangas", "characters", "people"]]
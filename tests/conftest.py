@@ -0,0 +1,39 @@
+import pytest_asyncio
+from aiohttp import web
+
+
+@pytest_asyncio.fixture
+async def server():
+    """
+    Local HTTP server for offline tests. Handlers are registered per test with ``server.route(path, handler)``,
+    every received request is recorded in ``server.requests``.
+    """
+    app = web.Application()
+    handlers = {}
+    requests = []
+
+    async def dispatch(request: web.Request) -> web.StreamResponse:
+        requests.append(request)
+        handler = handlers.get(request.path)
+        if handler is None:
+            return web.Response(status=404)
+        return await handler(request)
+
+    app.router.add_route("*", "/{tail:.*}", dispatch)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+
+    class Server:
+        url = f"http://127.0.0.1:{port}"
+
+        def __init__(self):
+            self.requests = requests
+
+        def route(self, path, handler):
+            handlers[path] = handler
+
+    yield Server()
+    await runner.cleanup()
@@ -1,9 +1,114 @@
 import pytest
-from moe_parsers.core.adapter import Client
+from asyncio import gather, sleep
+from aiohttp import web
+from moe_parsers.core.adapter import Client, RequestResponse
+from moe_parsers.core.retry import RetryPolicy
+from moe_parsers.core.useragent import UserAgentPool
 
 
 @pytest.mark.asyncio
 async def test_adapter():
-    client = Client(max_retries=10)
-    result = await client.get("https://httpbin.org/get")
+    async with Client(max_retries=10) as client:
+        result = await client.get("https://httpbin.org/get")
     assert result.status == 200
+
+
+@pytest.mark.asyncio
+async def test_session_reuse(server):
+    async def handler(request):
+        return web.json_response({"peer": request.transport.get_extra_info("peername")[1]})
+
+    server.route("/peer", handler)
+    async with Client() as client:
+        peers = {(await client.get(f"{server.url}/peer")).json["peer"] for _ in range(5)}
+        session = await client.get_session()
+        assert session is client._session
+    assert len(peers) == 1
+    assert session.closed
+
+
+def test_lazy_response():
+    response = RequestResponse(data='{"title": "Пластиковые воспоминания"}'.encode(), status=200, headers={})
+    assert "json" not in response.__dict__ and "soup" not in response.__dict__
+    assert response.json["title"] == "Пластиковые воспоминания"
+    assert response.text.startswith('{"title"')
+    assert "soup" not in response.__dict__
+
+
+@pytest.mark.asyncio
+async def test_stream(server, tmp_path):
+    async def handler(request):
+        response = web.StreamResponse()
+        await response.prepare(request)
+        for i in range(1000):
+            await response.write(f"line {i}\n".encode())
+        return response
+
+    server.route("/dump", handler)
+    async with Client() as client:
+        async with await client.get(f"{server.url}/dump", stream=True) as response:
+            lines = [line async for line in response.iter_lines(chunk_size=64)]
+        assert lines[0] == "line 0" and lines[-1] == "line 999" and len(lines) == 1000
+        async with await client.get(f"{server.url}/dump", stream=True) as response:
+            written = await response.save_to(tmp_path / "dump.txt")
+        assert written == (tmp_path / "dump.txt").stat().st_size
+
+
+@pytest.mark.asyncio
+async def test_coalesce(server):
+    async def handler(request):
+        await sleep(0.05)
+        return web.json_response({"count": len(server.requests)})
+
+    server.route("/title", handler)
+    async with Client(coalesce=True) as client:
+        responses = await gather(*[client.get(f"{server.url}/title", params={"id": 1}) for _ in range(20)])
+        other = await client.get(f"{server.url}/title", params={"id": 2})
+        queries = await gather(*[client.post(f"{server.url}/title", json={"query": "a"}) for _ in range(5)])
+        assert len({id(response) for response in queries}) == 1 and len(server.requests) == 3
+        await gather(*[client.delete(f"{server.url}/title") for _ in range(5)])
+        await gather(*[client.post(f"{server.url}/title", data={"form": "a"}) for _ in range(5)])
+    assert len({id(response) for response in responses}) == 1
+    assert other.json["count"] == 2 and len(server.requests) == 13
+
+
+@pytest.mark.asyncio
+async def test_metrics(server):
+    async def handler(request):
+        return web.Response(status=503 if len(server.requests) == 1 else 200, text="ok")
+
+    server.route("/metrics", handler)
+    events = []
+    async with Client(retry=RetryPolicy(backoff=0.01)) as client:
+        client.on("on_retry", lambda **data: events.append(("retry", data["reason"])))
+        client.on("after_response", lambda **data: events.append(("response", data["status"])))
+        await client.get(f"{server.url}/metrics")
+        stats = client.stats()
+        exported = client.prometheus()
+    assert events == [("response", 503), ("retry", 503), ("response", 200)]
+    counters = stats["requests"]["counters"]
+    assert {entry["labels"]["status"]: entry["value"] for entry in counters["requests_total"]} == {"503": 1, "200": 1}
+    assert counters["bytes_received_total"][0]["value"] == 4
+    assert stats["requests"]["histograms"]["request_duration_seconds"][0]["count"] == 2
+    assert 'moe_parsers_retries_total{host="127.0.0.1",reason="503"} 1' in exported
+    assert 'moe_parsers_request_duration_seconds_bucket{host="127.0.0.1",le="+Inf"} 2' in exported
+
+    client = Client(metrics=False)
+    assert client.stats()["requests"] is None
+    with pytest.raises(ValueError):
+        client.on("after_response", lambda **data: None)
+
+
+@pytest.mark.asyncio
+async def test_user_agents(server):
+    async def handler(request):
+        return web.Response(text=request.headers["User-Agent"])
+
+    server.route("/ua", handler)
+    pool = UserAgentPool(["a", "b", "c"])
+    assert [pool.next() for _ in range(6)][3:] == [pool.next() for _ in range(3)]
+    assert Client(user_agents=pool).headers["User-Agent"] in pool.agents
+    assert Client(headers={"User-Agent": "custom"}).headers == {"User-Agent": "custom"}
+    async with Client(user_agents=pool, sticky_user_agent=True) as client:
+        agents = {(await client.get(f"{server.url}/ua", proxy=server.url)).text for _ in range(3)}
+    assert agents == {pool.sticky(server.url)}
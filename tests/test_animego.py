@@ -0,0 +1,80 @@
+import pytest
+from asyncio import sleep
+from pathlib import Path
+from aiohttp import web
+from moe_parsers.core import html
+from moe_parsers.providers.animego import Animego, Anime
+
+PAGES = Path(__file__).parent / "pages"
+
+
+@pytest.mark.parametrize("backend", ["lxml", "html5lib"])
+def test_parser_backends(backend):
+    if not html.available(backend):
+        pytest.skip(f"{backend} is not installed")
+    page = (PAGES / "animego_anime.html").read_text("utf-8")
+    url = "anime/plastic-memories-123"
+    assert Animego.parse_info(page, url, backend) == Animego.parse_info(page, url, "html.parser")
+
+
+def test_backend_availability(monkeypatch):
+    lookups = []
+    monkeypatch.setattr(html, "find_spec", lambda name: lookups.append(name))
+    html.register_backend("missing", html.BACKENDS["html.parser"], requires="missing_module")
+    assert not html.available("missing") and not html.available("missing") and lookups == ["missing_module"]
+    # registering again forgets the cached result
+    monkeypatch.undo()
+    html.register_backend("missing", html.BACKENDS["html.parser"], requires="json")
+    assert html.available("missing")
+    html.BACKENDS.pop("missing")
+    html._REQUIREMENTS.pop("missing")
+    html._AVAILABLE.pop("missing")
+
+
+def test_partial_parsing():
+    page = (PAGES / "animego_anime.html").read_text("utf-8")
+    url = "anime/plastic-memories-123"
+    assert Animego.parse_info(page, url) == Animego.parse_info(page, url, partial=False)
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("executor", [None, "thread", "process"])
+async def test_get_info(server, executor):
+    running, peak = 0, 0
+
+    async def handler(request):
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        await sleep(0.05)
+        running -= 1
+        if request.path.endswith("/player"):
+            return web.json_response({"content": (PAGES / "animego_player.html").read_text("utf-8")})
+        if request.query.get("type") == "episodeSchedule":
+            return web.json_response({"content": (PAGES / "animego_episodes.html").read_text("utf-8")})
+        return web.Response(text=(PAGES / "animego_anime.html").read_text("utf-8"), content_type="text/html")
+
+    server.route("/anime/plastic-memories-123", handler)
+    server.route("/anime/123/player", handler)
+    async with Animego(executor=executor) as parser:
+        parser.client.base_url = f"{server.url}/"
+        info = await parser.get_info("anime/plastic-memories-123", translations=True)
+        assert peak == 3
+        assert "episodes" not in await parser.get_info("anime/plastic-memories-123", episodes=False)
+    assert info["animego_id"] == 123 and info["type"] == Anime.Type.TV
+    assert info["title"][Anime.Language.RUSSIAN] == "Воспоминания пластиковых кукол"
+    assert info["genres"] == ["драма", "романтика", "фантастика"]
+    assert info["studio"] == "Doga Kobo" and info["mpaa"] == "PG-13" and info["episode_duration"] == 24 * 60
+    assert info["rating"] == 8.9 and info["rating_count"] == 12345 and info["dubbing"] == ["AniLibria", "AnimeVost"]
+    assert info["characters"][0] == {
+        "name": "Айла",
+        "seiyuu": "Амамия Сора",
+        "seiyuu_url": "https://animego.me/person/101-sora-amamiya",
+    }
+    assert info["trailer"].startswith("https://www.youtube.com/") and len(info["screenshots"]) == 2
+    assert [episode.number for episode in info["episodes"]] == ["1", "2"]
+    assert info["episodes"][1].aired.day == 12
+    assert info["translations"] == [
+        {"name": "AniLibria", "translation_id": "1"},
+        {"name": "AnimeVost", "translation_id": "2"},
+    ]
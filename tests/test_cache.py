@@ -0,0 +1,95 @@
+import pytest
+from asyncio import sleep
+from secrets import token_hex
+from aiohttp import web
+from moe_parsers.core.adapter import Client
+from moe_parsers.core.cache import MemoryCache, SQLiteCache
+
+
+@pytest.mark.asyncio
+async def test_memory_cache(server):
+    async def handler(request):
+        body = await request.read()
+        return web.json_response({"count": len(server.requests), "body": body.decode()})
+
+    server.route("/graphql", handler)
+    async with Client(cache=True) as client:
+        first = await client.post(f"{server.url}/graphql", json={"query": "a"})
+        assert (await client.post(f"{server.url}/graphql", json={"query": "a"})) is first
+        assert (await client.post(f"{server.url}/graphql", json={"query": "b"})).json["count"] == 2
+        assert (await client.post(f"{server.url}/graphql", json={"query": "a"}, cache=False)).json["count"] == 3
+        refreshed = await client.post(f"{server.url}/graphql", json={"query": "a"}, refresh=True)
+        assert refreshed.json["count"] == 4
+        assert (await client.post(f"{server.url}/graphql", json={"query": "a"})) is refreshed
+        assert client.get_cache().hits == 2
+
+
+@pytest.mark.asyncio
+async def test_memory_cache_eviction(server):
+    async def handler(request):
+        return web.Response(text="x" * 100)
+
+    server.route("/big", handler)
+    async with Client(cache=MemoryCache(max_size=250)) as client:
+        for page in range(3):
+            await client.get(f"{server.url}/big", params={"p": page})
+        assert client.get_cache().stats()["entries"] == 2
+        await client.get(f"{server.url}/big", params={"p": 0})
+        assert len(server.requests) == 4
+
+    # the parsed tree kept on a cached response counts towards the limit
+    async with Client(cache=MemoryCache(max_size=1300)) as client:
+        await client.get(f"{server.url}/big", params={"p": 0})
+        (await client.get(f"{server.url}/big", params={"p": 1})).soup
+        assert client.get_cache().stats()["size"] == 200
+        await client.get(f"{server.url}/big", params={"p": 1})
+        assert client.get_cache().stats()["size"] == 100 + 100 * 12
+        await client.get(f"{server.url}/big", params={"p": 2})
+        assert client.get_cache().stats()["entries"] == 2
+        await client.get(f"{server.url}/big", params={"p": 0})
+        assert len(server.requests) == 8
+
+
+@pytest.mark.asyncio
+async def test_revalidation(server):
+    async def handler(request):
+        if request.headers.get("If-None-Match") == '"v1"':
+            return web.Response(status=304, headers={"ETag": '"v1"'})
+        return web.Response(text="<dl><dt>Тип</dt><dd>ТВ Сериал</dd></dl>", headers={"ETag": '"v1"'})
+
+    server.route("/anime/1", handler)
+    async with Client(cache=True) as client:
+        first = await client.get(f"{server.url}/anime/1", cache_lifetime=0.01)
+        soup = first.soup
+        await sleep(0.02)
+        second = await client.get(f"{server.url}/anime/1")
+        refreshed = await client.get(f"{server.url}/anime/1", refresh=True)
+    assert second is first and refreshed is first and second.soup is soup
+    assert [request.headers.get("If-None-Match") for request in server.requests] == [None, '"v1"', '"v1"']
+
+
+@pytest.mark.asyncio
+async def test_sqlite_cache(server, tmp_path):
+    async def handler(request):
+        return web.Response(text=token_hex(2000), headers={"X-Count": str(len(server.requests))})
+
+    server.route("/page", handler)
+    path = tmp_path / "cache.db"
+    async with Client(cache=SQLiteCache(path)) as client:
+        first = await client.get(f"{server.url}/page")
+    # a second cache on the same file stands in for another process
+    async with Client(cache=SQLiteCache(path, max_size=6000), html_parser="html.parser") as client:
+        cached = await client.get(f"{server.url}/page")
+        assert cached.text == first.text and cached.headers["x-count"] == "1"
+        assert cached.html_parser == "html.parser"
+        assert len(server.requests) == 1
+        stats = client.get_cache().stats()
+        assert stats["entries"] == 1 and stats["size"] < len(first.data)
+        for page in range(3):
+            await client.get(f"{server.url}/page", params={"p": page}, cache_lifetime=60)
+        assert client.get_cache().stats()["entries"] == 2
+        await client.get_cache().clear()
+        assert client.get_cache().stats() == {"entries": 0, "size": 0, "max_size": 6000, "hits": 1, "misses": 3}
+        # stats are kept in memory and never open the database on the event loop
+        client.get_cache().close()
+        assert client.get_cache().stats()["entries"] == 0 and client.get_cache()._connection is None
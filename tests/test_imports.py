@@ -0,0 +1,22 @@
+import subprocess
+import sys
+
+HEAVY_MODULES = {"cutlet", "fugashi", "unidic_lite", "bs4", "faker"}
+
+
+def imported_modules(statement: str) -> set:
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", statement], capture_output=True, text=True, check=True
+    )
+    return {
+        line.rsplit("|", 1)[-1].strip().split(".")[0]
+        for line in result.stderr.splitlines()
+        if line.startswith("import time:") and "|" in line
+    }
+
+
+def test_lazy_imports():
+    assert not imported_modules("import moe_parsers.providers") & HEAVY_MODULES
+    assert {"cutlet", "fugashi"} <= imported_modules(
+        "from moe_parsers.core.romaji import romanize; romanize('進撃の巨人')"
+    )
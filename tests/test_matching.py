@@ -0,0 +1,39 @@
+import pytest
+from aiohttp import web
+from moe_parsers.core.matching import TitleIndex, item_titles, normalize
+from moe_parsers.providers.shikimori import Shikimori
+
+ANIMES = [
+    {"id": "1", "name": "Shingeki no Kyojin", "english": "Attack on Titan", "russian": "Атака титанов"},
+    {"id": "2", "name": "Plastic Memories", "russian": "Воспоминания пластиковых кукол", "synonyms": ["PlaMemo"]},
+    {"id": "3", "name": "Kimi no Na wa.", "english": "Your Name.", "japanese": "君の名は。"},
+]
+
+
+def test_title_index():
+    assert normalize("Ｋｉｍｉ no  Na wa.") == "kimi no na wa"
+    items = [Shikimori.data2anime(data, None) for data in ANIMES]
+    assert "PlaMemo" in item_titles(items[1]) and "Атака титанов" in item_titles(items[0])
+
+    index = TitleIndex(items)
+    assert index.top_k("atack on titan", k=1)[0][1] is items[0]
+    assert index.top_k("атака титанов", k=1)[0][1] is items[0]
+    assert index.top_k("plamemo", k=1)[0][1] is items[1]
+    assert index.top_k("君の名は", k=1)[0][1] is items[2]
+    assert index.top_k("zzzz") == [] and len(index.top_k("no", k=5)) == 2
+    assert index.rank("your name")[0] is items[2] and index.rank("zzzz") == items
+
+    index = TitleIndex({"title": f"Title {i}", "synonyms": [f"Synonym {i}"]} for i in range(500))
+    assert index.top_k("synonym 250", k=1)[0][1]["title"] == "Title 250"
+
+
+@pytest.mark.asyncio
+async def test_sort_by_match(server):
+    async def handler(request):
+        return web.json_response({"data": {"animes": ANIMES}})
+
+    server.route("/api/graphql", handler)
+    async with Shikimori(romanize=False) as parser:
+        parser.client.base_url = f"{server.url}/"
+        results = await parser.search(search="kimi no nawa", sort_by_match=True, searchType="animes")
+    assert [anime.data["id"] for anime in results] == ["3", "1", "2"]
@@ -0,0 +1,65 @@
+from moe_parsers.core.items import Anime
+from moe_parsers.core.offline import OfflineIndex
+from moe_parsers.providers.shikimori import Shikimori
+
+ANIMES = [
+    {"id": 1, "malId": 16498, "name": "Shingeki no Kyojin", "english": "Attack on Titan", "russian": "Атака титанов"},
+    {"id": 2, "name": "Plastic Memories", "russian": "Воспоминания пластиковых кукол", "synonyms": ["PlaMemo"]},
+    {"id": 3, "name": "Kimi no Na wa.", "english": "Your Name.", "japanese": "君の名は。"},
+]
+
+
+def test_offline_index(tmp_path):
+    with OfflineIndex(tmp_path / "index") as index:
+        assert index.add(Shikimori.data2anime(ANIMES[0], None)) == "mal:16498"
+        index.extend(Shikimori.data2anime(data, None) for data in ANIMES[1:])
+        assert index.search("attack on titan") == []
+
+    index = OfflineIndex(tmp_path / "index")
+    assert len(index) == 3 and index.get("shikimori:2")["titles"][0] == "Воспоминания пластиковых кукол"
+    assert index.search("atack on titan", k=1)[0][1]["ids"] == {"mal": 16498, "shikimori": 1}
+    assert index.search("plamemo", k=1)[0][1]["ids"]["shikimori"] == 2
+    assert index.search("zzzz") == [] and len(index.search("no", k=5)) == 2
+    assert [record["ids"]["shikimori"] for _, record in index.prefix("shingeki no ky")] == [1]
+    assert [record["ids"]["shikimori"] for _, record in index.prefix("восп")] == [2]
+    assert len(index.prefix("kyojin shin")) == 1 and index.prefix("shingeki na") == []
+    assert index.find(3)[0]["titles"][-1] == "Kimi no Na wa." and index.find(16498, "shikimori") == []
+
+    # animego pages are ingested as dicts, updates go to new segments and the newest record wins
+    index.add({"animego_id": 123, "url": "https://animego.me/anime/123", "title": {Anime.Language.RUSSIAN: "Твоё имя"}})
+    index.add({"ids": {"shikimori": 2}, "title": "Plastic Memories"}, key="shikimori:2")
+    index.delete("shikimori:3")
+    index.commit()
+    assert len(index._segments) == 2 and len(index) == 3 and index.get("shikimori:3") is None
+    assert index.search("твое имя", k=1)[0][1]["ids"] == {"animego": 123}
+    assert index.get("shikimori:2")["titles"] == ["Plastic Memories"] and index.search("plamemo", min_score=0.5) == []
+    assert index.find(3) == [] and index.prefix("kimi") == []
+
+    index.compact()
+    assert len(index._segments) == 1 and len(index) == 3
+    assert len(list((tmp_path / "index").iterdir())) == 2
+    index.close()
+
+    with OfflineIndex(tmp_path / "index", max_segments=2) as index:
+        assert index.get("animego:123")["url"] == "https://animego.me/anime/123"
+        for i in range(3):
+            index.add({"ids": {"kodik": i}, "title": f"Title {i}"})
+            index.commit()
+        # the third commit went over the limit and compacted the index
+        assert len(index._segments) == 2 and len(index) == 6
+        assert len(index.prefix("title", k=2)) == 2 and index.prefix("title 1")[0][1]["ids"] == {"kodik": 1}
+
+
+def test_interrupted_commit(tmp_path):
+    with OfflineIndex(tmp_path) as index:
+        index.add({"ids": {"kodik": 1}, "title": "First"})
+    # a process died after creating the next segment but before updating the manifest
+    (tmp_path / "000002").mkdir()
+    (tmp_path / "000002" / "docs.bin").write_bytes(b"partial")
+    (tmp_path / ".000002.tmp").mkdir()
+    with OfflineIndex(tmp_path) as index:
+        index.add({"ids": {"kodik": 2}, "title": "Second"})
+        index.commit()
+        assert [record["ids"] for _, record in index.search("second", k=1)] == [{"kodik": 2}]
+        index.compact()
+        assert len(index) == 2 and sorted(path.name for path in tmp_path.iterdir()) == ["000003", "manifest.json"]
@@ -0,0 +1,68 @@
+import pytest
+from asyncio import sleep
+from json import dumps
+from re import search
+from aiohttp import web
+from moe_parsers.core.parser import Parser
+from moe_parsers.providers.shikimori import Shikimori, Anime
+
+
+@pytest.mark.asyncio
+async def test_map_ids():
+    running, peak, reports = 0, 0, []
+
+    async def fetch(item_id):
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        await sleep(0.001 * (item_id % 5))
+        running -= 1
+        if item_id == 13:
+            raise ValueError(item_id)
+        return item_id * 2
+
+    async with Parser() as parser:
+        results = [
+            result
+            async for result in parser.map_ids(
+                fetch, range(50), concurrency=4, ordered=True, progress=lambda *args: reports.append(args)
+            )
+        ]
+        assert peak == 4
+        unordered = [result async for result in parser.map_ids(fetch, (i for i in range(20)), concurrency=8)]
+    assert [result.index for result in results] == list(range(50))
+    assert [result.key for result in results if not result.ok] == [13]
+    assert isinstance(results[13].error, ValueError) and results[49].result == 98
+    assert reports[-1] == (50, 50, 1)
+    assert sorted(result.key for result in unordered) == list(range(20))
+
+
+@pytest.mark.asyncio
+async def test_shikimori_gather_info(server):
+    async def handler(request):
+        ids = search(r'ids: "([\d,]+)"', (await request.json())["query"]).group(1).split(",")
+        if "7" in ids:
+            return web.Response(status=400, text="bad request")
+        return web.json_response({"data": {"animes": [{"id": i, "name": f"#{i}"} for i in ids if i != "2"]}})
+
+    server.route("/api/graphql", handler)
+    async with Shikimori() as parser:
+        parser.client.base_url = f"{server.url}/"
+        results = [result async for result in parser.gather_info(range(10), 2, chunk_size=3, ordered=True)]
+    assert len(server.requests) == 4
+    assert [result.key for result in results] == [str(i) for i in range(10)]
+    assert [result.key for result in results if not result.ok] == ["2", "6", "7", "8"]
+    assert isinstance(results[2].error, LookupError)
+    assert isinstance(results[0].result, Anime) and results[0].result.data["name"] == "#0"
+
+
+@pytest.mark.asyncio
+async def test_run_cpu():
+    data = dumps({"data": {"animes": [{"id": "1", "japanese": "東京"}], "people": [{"id": "2", "name": "Sora"}]}})
+    async with Shikimori(executor="process") as parser:
+        anime, person = await parser.run_cpu(parser.parse_results, data.encode())
+    assert isinstance(anime, Anime) and anime.title[Anime.Language.ROMAJI] == ["Tokyo"]
+    assert person.name[Anime.Language.ENGLISH] == ["Sora"]
+    with pytest.raises(ValueError):
+        await Parser(executor="fibers").run_cpu(len, [])
+    assert await Parser().run_cpu(len, [1, 2]) == 2
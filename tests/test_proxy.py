@@ -0,0 +1,101 @@
+import pytest
+import time
+from asyncio import sleep
+from aiohttp import web
+from moe_parsers.core.adapter import Client
+from moe_parsers.core.proxy import CircuitBreaker, ProxySwithcher
+
+
+def test_least_used():
+    switcher = ProxySwithcher([f"http://10.0.0.{i}:8080" for i in range(4)])
+    picked = []
+    for _ in range(8):
+        proxy = switcher.pick(ignore=["http://10.0.0.0:8080"])
+        switcher.use(proxy)
+        picked.append(proxy.ip)
+    assert "10.0.0.0" not in picked
+    assert {proxy.use_count for proxy in switcher.proxies if proxy.ip != "10.0.0.0"} <= {2, 3}
+    assert switcher.get_by_url("http://10.0.0.2:8080").ip == "10.0.0.2"
+
+
+def test_strategies():
+    for strategy in ("latency", "round_robin", "weighted_random"):
+        switcher = ProxySwithcher([f"http://10.0.0.{i}:8080" for i in range(50)], strategy=strategy)
+        for i, proxy in enumerate(switcher.proxies):
+            switcher.report(proxy, latency=5 if i == 7 else 500)
+        switcher.remove("http://10.0.0.3:8080")
+        picks = [switcher.pick() for _ in range(200)]
+        assert len(switcher) == 49 and all(proxy.ip != "10.0.0.3" for proxy in picks)
+        if strategy == "latency":
+            assert all(proxy.ip == "10.0.0.7" for proxy in picks)
+        if strategy == "round_robin":
+            assert len({proxy.ip for proxy in picks[:49]}) == 49
+    assert ProxySwithcher().pick() is None
+
+
+def test_circuit_breaker():
+    switcher = ProxySwithcher(["http://10.0.0.1:8080", "http://10.0.0.2:8080"], strategy="round_robin")
+    dead = switcher.get_by_url("http://10.0.0.1:8080")
+    dead.breaker = CircuitBreaker(failure_threshold=2, reset_timeout=0.05)
+    switcher.report(dead, ok=False)
+    switcher.report(dead, ok=False)
+    assert dead.breaker.state == CircuitBreaker.OPEN
+    assert {switcher.pick().ip for _ in range(4)} == {"10.0.0.2"}
+    assert switcher.stats()["open"] == 1 and switcher.stats()["available"] == 1
+    time.sleep(0.06)
+    assert {switcher.pick().ip for _ in range(4)} == {"10.0.0.1", "10.0.0.2"}
+    switcher.report(dead, ok=False)
+    assert dead.breaker.state == CircuitBreaker.OPEN
+    time.sleep(0.06)
+    switcher.report(dead, ok=True)
+    assert dead.breaker.state == CircuitBreaker.CLOSED and switcher.stats()["open"] == 0
+
+
+@pytest.mark.asyncio
+async def test_import_proxies(server):
+    async def handler(request):
+        return web.json_response({"origin": "127.0.0.1"})
+
+    server.route("/ip", handler)
+    switcher = ProxySwithcher(check_url=f"{server.url}/ip", check_timeout=2)
+    reports = []
+    proxies = [server.url if i % 2 else "http://127.0.0.1:1" for i in range(40)]
+    valid = await switcher.import_proxies(proxies, concurrency=8, progress=lambda *args: reports.append(args))
+    await switcher.close()
+    assert len(valid) == 20 and len(switcher) == 1
+    assert reports[-1] == (40, 40, 20)
+    async with Client(proxy=switcher) as client:
+        assert (await client.get(f"{server.url}/ip")).status == 200
+        assert switcher.get_by_url(server.url).use_count == 1
+
+
+@pytest.mark.asyncio
+async def test_health_checks(server):
+    async def handler(request):
+        return web.json_response({"origin": "127.0.0.1"})
+
+    server.route("/ip", handler)
+    switcher = ProxySwithcher([server.url, "http://127.0.0.1:1"], check_url=f"{server.url}/ip", check_timeout=2)
+    live, dead = switcher.get_by_url(server.url), switcher.get_by_url("http://127.0.0.1:1")
+    for proxy in (live, dead):
+        proxy.breaker = CircuitBreaker(failure_threshold=1, reset_timeout=60)
+    assert await switcher.health_check(concurrency=1) == {"probed": 2, "healthy": 1}
+    assert dead.breaker.state == CircuitBreaker.OPEN and live.breaker.state == CircuitBreaker.CLOSED
+    # open breakers are not probed again until they become half-open
+    assert await switcher.health_check() == {"probed": 1, "healthy": 1}
+
+    probes = len(server.requests)
+    task = switcher.start_health_checks(interval=0.01)
+    await sleep(0.1)
+    switcher.stop_health_checks()
+    await sleep(0)
+    assert task.cancelled() and len(server.requests) - probes >= 2
+    probes = len(server.requests)
+    await sleep(0.05)
+    assert len(server.requests) == probes
+
+    switcher.report(live, ok=False)
+    async with Client(proxy=switcher) as client:
+        with pytest.raises(Client.Exceptions.NoProxyAvailable):
+            await client.get(f"{server.url}/ip")
+    await switcher.close()
@@ -0,0 +1,115 @@
+import pytest
+from asyncio import create_task, gather, sleep, wait_for
+from time import monotonic
+from aiohttp import web
+from moe_parsers.core.adapter import Client
+from moe_parsers.core.ratelimit import RateLimiter
+from moe_parsers.providers.shikimori import Shikimori
+
+
+@pytest.mark.asyncio
+async def test_rate_limiter(server):
+    async def handler(request):
+        return web.Response(text="ok")
+
+    server.route("/limited", handler)
+    async with Client(rate_limits={"127.0.0.1": [(5, 0.25)]}) as client:
+        start = monotonic()
+        responses = await gather(*[client.get(f"{server.url}/limited") for _ in range(10)])
+        elapsed = monotonic() - start
+        stats = client.get_rate_limiter().stats()["127.0.0.1"]
+    assert all(response.status == 200 for response in responses)
+    assert elapsed >= 0.24
+    assert stats["acquired"] == 10 and stats["waiting"] == 0 and stats["max_wait"] > 0
+
+
+def test_provider_default_limits():
+    assert Shikimori().client.get_rate_limiter().limits["shikimori.one"] == [(5, 1), (90, 60)]
+    client = Client(rate_limits={"shikimori.one": [(1, 10)]})
+    assert Shikimori(client=client).client.get_rate_limiter().limits["shikimori.one"] == [(1, 10)]
+
+
+@pytest.mark.asyncio
+async def test_priorities():
+    limiter = RateLimiter({"host": [(1, 0.02)]}, aging=0)
+    order = []
+
+    async def acquire(name, priority):
+        await limiter.acquire("host", priority=priority)
+        order.append(name)
+
+    await limiter.acquire("host")
+    await gather(*[acquire(f"crawl{i}", 0) for i in range(3)], acquire("user", 10))
+    assert order == ["user", "crawl0", "crawl1", "crawl2"]
+
+    limiter, order = RateLimiter({"host": [(1, 0.05)]}, aging=100), []
+    await limiter.acquire("host")
+    old = create_task(acquire("old", 0))
+    await sleep(0.03)
+    await gather(old, acquire("new", 1))
+    assert order == ["old", "new"]
+
+
+@pytest.mark.asyncio
+async def test_host_concurrency(server):
+    running, peak = 0, 0
+
+    async def handler(request):
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        await sleep(0.01)
+        running -= 1
+        return web.Response(text="ok")
+
+    server.route("/slow", handler)
+    async with Client(host_concurrency={"127.0.0.1": 2}) as client:
+        async with await client.get(f"{server.url}/slow", stream=True) as stream:
+            await gather(*[client.get(f"{server.url}/slow", priority=i % 3) for i in range(8)])
+            assert client.get_rate_limiter().stats()["127.0.0.1"]["active"] == 1
+        stats = client.get_rate_limiter().stats()["127.0.0.1"]
+    # the open stream keeps one of the two slots
+    assert stream.status == 200 and peak == 1
+    assert stats["active"] == 0 and stats["acquired"] == 9
+
+
+@pytest.mark.asyncio
+async def test_failing_hook_releases_slot(server):
+    async def handler(request):
+        return web.Response(text="ok")
+
+    def hook(**data):
+        if not calls:
+            calls.append(data)
+            raise RuntimeError("hook failed")
+
+    calls = []
+    server.route("/hooked", handler)
+    async with Client(host_concurrency={"127.0.0.1": 1}) as client:
+        client.on("before_request", hook)
+        with pytest.raises(RuntimeError):
+            await client.get(f"{server.url}/hooked")
+        assert client.get_rate_limiter().stats()["127.0.0.1"]["active"] == 0
+        response = await wait_for(client.get(f"{server.url}/hooked"), 2)
+    assert response.status == 200
+
+
+@pytest.mark.asyncio
+async def test_failing_stream_hook_releases_slot(server):
+    async def handler(request):
+        return web.Response(text="ok")
+
+    def hook(**data):
+        if not calls:
+            calls.append(data)
+            raise RuntimeError("hook failed")
+
+    calls = []
+    server.route("/hooked", handler)
+    async with Client(host_concurrency={"127.0.0.1": 1}) as client:
+        client.on("after_response", hook)
+        with pytest.raises(RuntimeError):
+            await client.get(f"{server.url}/hooked", stream=True)
+        assert client.get_rate_limiter().stats()["127.0.0.1"]["active"] == 0
+        async with await wait_for(client.get(f"{server.url}/hooked", stream=True), 2) as response:
+            assert await response.read() == b"ok"
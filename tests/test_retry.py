@@ -0,0 +1,44 @@
+import pytest
+from aiohttp import web
+from moe_parsers.core.adapter import Client
+from moe_parsers.core.retry import RetryPolicy, RetryBudget
+
+
+@pytest.mark.asyncio
+async def test_retry_policy(server):
+    async def flaky(request):
+        return web.Response(status=503 if len(server.requests) < 3 else 200)
+
+    async def broken(request):
+        return web.Response(status=500)
+
+    server.route("/flaky", flaky)
+    server.route("/broken", broken)
+    async with Client(retry=RetryPolicy(max_retries=3, backoff=0.01)) as client:
+        assert (await client.get(f"{server.url}/flaky")).status == 200
+        assert len(server.requests) == 3
+        assert (await client.get(f"{server.url}/broken", ignore_codes=[500])).status == 500
+        with pytest.raises(Client.Exceptions.TooManyRetries):
+            await client.get(f"{server.url}/broken")
+        assert len(server.requests) == 8
+
+
+def test_retry_budget():
+    policy = RetryPolicy(max_retries=10, budget=RetryBudget(ratio=0.5, min_per_second=0, window=60))
+    for _ in range(4):
+        policy.budget.record_request()
+    assert [policy.delay(0, 503) is not None for _ in range(3)] == [True, True, False]
+    assert policy.delay(10, 503) is None
+
+
+def test_retry_budget_memory(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr("moe_parsers.core.retry.monotonic", lambda: now[0])
+    budget = RetryBudget(ratio=0.5, min_per_second=0, window=10)
+    for i in range(100000):
+        now[0] = 1000 + i / 1000
+        budget.record_request()
+    assert len(budget._requests) <= 12 and budget._request_count <= 12000
+    now[0] += 20
+    budget.record_request()
+    assert len(budget._requests) == 1 and budget._request_count == 1
@@ -0,0 +1,93 @@
+import pickle
+import pytest
+from pathlib import Path
+from aiohttp import web
+from moe_parsers.core.items import LazyDict
+from moe_parsers.core.romaji import Romanizer
+from moe_parsers.providers.animego import Animego, Anime
+from moe_parsers.providers.shikimori import Shikimori
+
+PAGES = Path(__file__).parent / "pages"
+
+
+def test_romanizer(tmp_path):
+    romanizer = Romanizer(max_size=2, path=tmp_path / "romaji.db")
+    assert romanizer.romaji("進撃の巨人") == romanizer.romaji("進撃の巨人") != "進撃の巨人"
+    assert romanizer.batch(["東京", "", "東京", "大阪"]) == [
+        romanizer.romaji("東京"),
+        "",
+        romanizer.romaji("東京"),
+        romanizer.romaji("大阪"),
+    ]
+    assert romanizer.stats()["entries"] == 2 and romanizer.stats()["misses"] == 3
+    romanizer.close()
+
+    persistent = Romanizer(path=tmp_path / "romaji.db")
+    assert persistent.batch(["進撃の巨人", "東京", "大阪"]) == [
+        romanizer.romaji("進撃の巨人"),
+        romanizer.romaji("東京"),
+        romanizer.romaji("大阪"),
+    ]
+    assert persistent.misses == 0
+
+
+def test_shared_romanization():
+    romanizer = Romanizer()
+    person = {"id": 1, "name": "Sora Amamiya", "japanese": "雨宮天"}
+    anime = Shikimori.data2anime(
+        {
+            "id": 1,
+            "japanese": "プラスティック・メモリーズ",
+            "personRoles": [{"rolesEn": ["Voice Actor"], "person": person}],
+        },
+        romanizer,
+    )
+    assert romanizer.misses == 0
+    assert anime.actors[0].name[anime.Language.ROMAJI] == [romanizer.romaji("雨宮天").title()]
+    assert romanizer.misses == 1
+    assert anime.title[anime.Language.ROMAJI] == [romanizer.romaji("プラスティック・メモリーズ").title()]
+    assert romanizer.misses == 2
+
+
+def test_lazy_dict():
+    calls = []
+    names = LazyDict({"en": ["Name"]}).defer("romaji", lambda: calls.append(1) or ["Romaji"])
+    assert len(names) == 2 and "romaji" in names and names.get("en") == ["Name"] and not calls
+    assert names["romaji"] == names["romaji"] == ["Romaji"] and len(calls) == 1
+
+    names.defer("other", lambda: calls.append(1) or ["Other"])
+    names["other"] = ["Set"]
+    assert names["other"] == ["Set"] and len(calls) == 1
+
+    names.defer("last", lambda: ["Last"])
+    assert dict(names) == {"en": ["Name"], "romaji": ["Romaji"], "other": ["Set"], "last": ["Last"]}
+    assert pickle.loads(pickle.dumps(names.copy().defer("more", lambda: ["More"])))["more"] == ["More"]
+
+
+@pytest.mark.asyncio
+async def test_romanize_disabled(server):
+    async def graphql(request):
+        person = {"id": 2, "name": "Sora Amamiya", "japanese": "雨宮天"}
+        anime = {
+            "id": 1,
+            "japanese": "プラスティック・メモリーズ",
+            "personRoles": [{"rolesEn": ["Voice Actor"], "person": person}],
+        }
+        return web.json_response({"data": {"animes": [anime]}})
+
+    async def page(request):
+        return web.Response(text=(PAGES / "animego_anime.html").read_text("utf-8"), content_type="text/html")
+
+    server.route("/api/graphql", graphql)
+    server.route("/anime/plastic-memories-123", page)
+    romanizer = Romanizer()
+    async with Shikimori(romanize=False, romanizer=romanizer) as parser:
+        parser.client.base_url = f"{server.url}/"
+        anime = [item async for item in parser.search_generator(search="plastic", searchType="animes")][0]
+    assert anime.title[anime.Language.ROMAJI] == [] and anime.title[anime.Language.JAPANESE]
+    assert anime.actors[0].name[anime.Language.ROMAJI] == []
+    async with Animego(romanize=False, romanizer=romanizer) as parser:
+        parser.client.base_url = f"{server.url}/"
+        info = await parser.get_info("anime/plastic-memories-123", episodes=False)
+    assert info["title"][Anime.Language.ROMAJI] == [] and info["title"][Anime.Language.JAPANESE]
+    assert romanizer.hits == romanizer.misses == 0
@@ -4,8 +4,8 @@ from moe_parsers.providers.shikimori import Shikimori, Anime
 
 @pytest.mark.asyncio
 async def test_search():
-    parser = Shikimori()
-    item = await parser.search(limit=1, search="plastic memories", searchType="animes")
+    async with Shikimori() as parser:
+        item = await parser.search(limit=1, search="plastic memories", searchType="animes")
     assert isinstance(item, Anime)
     assert len(item.characters) > 0
     assert len(item.directors) > 0